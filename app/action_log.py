@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .db import Database
+
+logger = logging.getLogger(__name__)
+
+ActionRow = Tuple[Optional[int], Optional[str], str, str, str]
+
+
+class ActionLog:
+    """
+    Буферизированная запись событий в таблицу actions.
+    Хендлеры только кладут событие в очередь, а фоновая задача сбрасывает
+    накопленное одной транзакцией каждые flush_interval секунд или max_batch событий.
+    Неудачная запись (например, database is locked) повторяется с нарастающей
+    паузой до retry_attempts раз; пока идут повторы, новые события копятся в той
+    же ограниченной очереди. Пачка отбрасывается только после последней попытки
+    и учитывается в dropped.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        max_batch: int = 200,
+        flush_interval: float = 0.5,
+        max_queue: int = 10000,
+        retry_attempts: int = 5,
+        retry_delay: float = 0.1,
+    ):
+        self.database = database
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.retry_attempts = max(1, retry_attempts)
+        self.retry_delay = retry_delay
+        # событий, потерянных после всех повторов
+        self.dropped = 0
+        # ограниченная очередь: при переполнении put() ждёт, пока фоновая задача разгрузит её
+        self._queue: "asyncio.Queue[Optional[ActionRow]]" = asyncio.Queue(maxsize=max(1, max_queue))
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Сбрасывает всё, что осталось в очереди, и останавливает фоновую задачу."""
+        if self._task is None:
+            await self._flush(self._drain())
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def add_action(
+        self,
+        action: str,
+        user_id: Optional[int],
+        username: Optional[str],
+        details: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        # время фиксируем в момент события, а не в момент сброса на диск
+        created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        await self._queue.put((user_id, username, action, json.dumps(details or {}), created_at))
+
+    def _drain(self) -> List[ActionRow]:
+        rows: List[ActionRow] = []
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return rows
+            if row is not None:
+                rows.append(row)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                await self._flush(self._drain())
+                return
+            batch = [first]
+            stop = False
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    row = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        row = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+            await self._flush(batch)
+            if stop:
+                await self._flush(self._drain())
+                return
+
+    async def _flush(self, rows: List[ActionRow]) -> None:
+        if not rows:
+            return
+        for attempt in range(1, self.retry_attempts + 1):
+            try:
+                await self.database.add_actions(rows)
+                return
+            except Exception:  # noqa: BLE001
+                if attempt == self.retry_attempts:
+                    self.dropped += len(rows)
+                    logger.exception(
+                        "Dropped %d actions after %d attempts (%d dropped in total)",
+                        len(rows),
+                        attempt,
+                        self.dropped,
+                    )
+                    return
+                logger.warning("Failed to write %d actions, retry %d", len(rows), attempt, exc_info=True)
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
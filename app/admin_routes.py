@@ -1,15 +1,30 @@
+import asyncio
+import csv
 import hashlib
-import hmac
 import io
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Any, AsyncIterator, Optional, List
 
-from fastapi import APIRouter, Cookie, Depends, Form, Header, HTTPException, Response, status, Body
+from fastapi import APIRouter, Cookie, Depends, Form, Header, HTTPException, Query, Request, Response, status, Body
 from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, StreamingResponse
+from aiogram.exceptions import TelegramAPIError
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from .assets import StaticAssets
+from .auth import CredentialStore
+from .broadcast import BroadcastEngine
+from .compression import etag_matches
 from .config import Settings
-from .db import Database
+from .db import CHANGE_COLUMNS, DEFAULT_SORT, EXPORT_COLUMNS, LIST_SORTS, SEARCH_KINDS, CursorError, Database, list_cursor
+from .events import EventBus
+from .media_cache import MediaCache, iter_file, parse_range
+
+
+# версия формата ответа /dashboard: увеличивается при несовместимых изменениях
+DASHBOARD_VERSION = 1
 
 
 def build_admin_router(
@@ -18,43 +33,14 @@ def build_admin_router(
     bot,
     static_dir: Path,
     admin_panel_dir: Path,
+    broadcasts: BroadcastEngine,
+    media: MediaCache,
+    events: EventBus,
+    assets: StaticAssets,
 ) -> APIRouter:
     router = APIRouter()
 
-    def _session_secret() -> str:
-        secret = settings.admin_panel_secret or settings.api_key
-        if not secret:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="ADMIN_SECRET or API_KEY must be set for admin auth",
-            )
-        return secret
-
-    def _allowed_logins() -> List[str]:
-        allowed = [login for login, _ in (settings.admin_credentials or [])]
-        if settings.admin_panel_user_id:
-            allowed.append(str(settings.admin_panel_user_id))
-        return allowed
-
-    def _sign_session(user_id: str) -> str:
-        secret = _session_secret().encode()
-        digest = hmac.new(secret, user_id.encode(), hashlib.sha256).hexdigest()
-        return f"{user_id}.{digest}"
-
-    def _verify_session(raw: Optional[str]):
-        if not raw:
-            return None
-        try:
-            user_id, _signature = raw.split(".", 1)
-        except ValueError:
-            return None
-        expected = _sign_session(user_id)
-        if not hmac.compare_digest(expected, raw):
-            return None
-        allowed = _allowed_logins()
-        if allowed and user_id not in allowed:
-            return None
-        return user_id
+    credentials = CredentialStore.from_settings(settings)
 
     async def verify_admin(
         x_api_key=Header(default=None),
@@ -62,42 +48,239 @@ def build_admin_router(
     ) -> None:
         if settings.api_key and x_api_key == settings.api_key:
             return
-        if _verify_session(session):
+        if credentials.verify(session):
             return
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
 
     Auth = Depends(verify_admin)
 
-    async def _require_credentials() -> List[Tuple[str, str]]:
-        pairs = settings.admin_credentials or []
-        if settings.admin_panel_user_id and settings.admin_panel_password:
-            pairs.append((str(settings.admin_panel_user_id), settings.admin_panel_password))
-        if not pairs:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Admin credentials not set",
-            )
-        return pairs
+    def Versioned(entity: Optional[str]):
+        """
+        Условный GET для списков: ETag — номер последнего изменения списка в журнале
+        changes плюс параметры запроса. Совпал с If-None-Match — 304 без чтения списка.
+        entity=None — версия по всем спискам сразу плюс текущий час: stats.week
+        в /dashboard уменьшается со временем без новых записей в changes.
+        """
+
+        async def check(request: Request, response: Response) -> None:
+            if entity is None:
+                hour = datetime.now(timezone.utc).strftime("%Y%m%d%H")
+                version = f"{await database.changes_token()}.{hour}"
+            else:
+                version = await database.changes_version(entity)
+            query = hashlib.sha256(request.url.query.encode()).hexdigest()[:8]
+            etag = f'"{entity or "all"}.{version}.{query}"'
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+            response.headers["ETag"] = etag
+            # браузер хранит ответ, но перед использованием сверяет ETag
+            response.headers["Cache-Control"] = "private, no-cache"
+
+        return Depends(check)
+
+    def _page(
+        items: List[dict],
+        limit: int,
+        after_id: Optional[Any],
+        before_id: Optional[Any],
+        entity: Optional[str] = None,
+        sort: str = DEFAULT_SORT,
+    ) -> dict:
+        # курсор продолжает выдачу в том же направлении, что и запрос; у списков
+        # из LIST_SORTS он несёт позицию в сортировке (list_cursor), у диалогов — id
+        next_cursor = None
+        if items and len(items) >= limit:
+            forward = after_id is not None and before_id is None
+            item = items[0] if forward else items[-1]
+            next_cursor = list_cursor(entity, sort, item) if entity else item["id"]
+        return {"items": items, "limit": limit, "next_cursor": next_cursor}
+
+    @asynccontextmanager
+    async def _cursor_errors() -> AsyncIterator[None]:
+        # битый курсор или курсор на удалённую запись — 400, клиент начинает с первой страницы
+        try:
+            yield
+        except CursorError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    def _parse_date_bound(value: Optional[str]) -> Optional[str]:
+        # created_at хранится строкой "YYYY-MM-DD HH:MM:SS" (UTC)
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid date: {value}")
+        return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+    def SortKey(entity: str):
+        """Параметр sort: ключ из LIST_SORTS, с "-" — по убыванию; чужой ключ — 422."""
+        return Query(DEFAULT_SORT, pattern=f"^-?({'|'.join(LIST_SORTS[entity])})$")
 
     @router.get("/submissions")
-    async def submissions(limit: int = 50, auth: None = Auth) -> dict:
-        items = await database.list_submissions(limit=limit)
-        return {"items": items, "limit": limit}
+    async def submissions(
+        limit: int = Query(50, ge=1, le=500),
+        before_id: Optional[str] = None,
+        after_id: Optional[str] = None,
+        bank: Optional[str] = Query(None, max_length=64),
+        submission_status: Optional[str] = Query(None, alias="status", max_length=32),
+        user_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        sort: str = SortKey("submissions"),
+        auth: None = Auth,
+        version: None = Versioned("submissions"),
+    ) -> dict:
+        async with _cursor_errors():
+            items = await database.list_submissions(
+                limit=limit,
+                before_id=before_id,
+                after_id=after_id,
+                bank=bank,
+                status=submission_status,
+                user_id=user_id,
+                date_from=_parse_date_bound(date_from),
+                date_to=_parse_date_bound(date_to),
+                sort=sort,
+            )
+        return _page(items, limit, after_id, before_id, "submissions", sort)
 
     @router.get("/actions")
-    async def actions(limit: int = 50, auth: None = Auth) -> dict:
-        items = await database.list_actions(limit=limit)
-        return {"items": items, "limit": limit}
+    async def actions(
+        limit: int = Query(50, ge=1, le=500),
+        before_id: Optional[str] = None,
+        after_id: Optional[str] = None,
+        action: Optional[str] = Query(None, max_length=64),
+        user_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        sort: str = SortKey("actions"),
+        auth: None = Auth,
+        version: None = Versioned("actions"),
+    ) -> dict:
+        async with _cursor_errors():
+            items = await database.list_actions(
+                limit=limit,
+                before_id=before_id,
+                after_id=after_id,
+                action=action,
+                user_id=user_id,
+                date_from=_parse_date_bound(date_from),
+                date_to=_parse_date_bound(date_to),
+                sort=sort,
+            )
+        return _page(items, limit, after_id, before_id, "actions", sort)
 
     @router.get("/questions")
-    async def questions(limit: int = 50, auth: None = Auth) -> dict:
-        items = await database.list_questions(limit=limit)
-        return {"items": items, "limit": limit}
+    async def questions(
+        limit: int = Query(50, ge=1, le=500),
+        before_id: Optional[str] = None,
+        after_id: Optional[str] = None,
+        user_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        sort: str = SortKey("questions"),
+        auth: None = Auth,
+        version: None = Versioned("questions"),
+    ) -> dict:
+        async with _cursor_errors():
+            items = await database.list_questions(
+                limit=limit,
+                before_id=before_id,
+                after_id=after_id,
+                user_id=user_id,
+                date_from=_parse_date_bound(date_from),
+                date_to=_parse_date_bound(date_to),
+                sort=sort,
+            )
+        return _page(items, limit, after_id, before_id, "questions", sort)
 
     @router.get("/reports")
-    async def reports(limit: int = 50, auth: None = Auth) -> dict:
-        items = await database.list_reports(limit=limit)
-        return {"items": items, "limit": limit}
+    async def reports(
+        limit: int = Query(50, ge=1, le=500),
+        before_id: Optional[str] = None,
+        after_id: Optional[str] = None,
+        user_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        sort: str = SortKey("reports"),
+        auth: None = Auth,
+        version: None = Versioned("reports"),
+    ) -> dict:
+        async with _cursor_errors():
+            items = await database.list_reports(
+                limit=limit,
+                before_id=before_id,
+                after_id=after_id,
+                user_id=user_id,
+                date_from=_parse_date_bound(date_from),
+                date_to=_parse_date_bound(date_to),
+                sort=sort,
+            )
+        return _page(items, limit, after_id, before_id, "reports", sort)
+
+    @router.get("/export/{table}")
+    async def export_table(
+        table: str,
+        format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        auth: None = Auth,
+    ) -> StreamingResponse:
+        columns = EXPORT_COLUMNS.get(table)
+        if columns is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown table")
+        batches = database.iter_export(
+            table,
+            date_from=_parse_date_bound(date_from),
+            date_to=_parse_date_bound(date_to),
+        )
+
+        async def ndjson():
+            async for rows in batches:
+                lines = []
+                for row in rows:
+                    item = dict(zip(columns, row))
+                    if "details" in item:
+                        item["details"] = json.loads(item["details"] or "{}")
+                    lines.append(json.dumps(item, ensure_ascii=False))
+                yield "\n".join(lines) + "\n"
+
+        async def csv_rows():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            async for rows in batches:
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+
+        if format == "csv":
+            body, media_type = csv_rows(), "text/csv; charset=utf-8"
+        else:
+            body, media_type = ndjson(), "application/x-ndjson"
+        return StreamingResponse(
+            body,
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+        )
+
+    @router.get("/search")
+    async def search(
+        q: str = Query(..., min_length=1, max_length=200),
+        kind: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=100),
+        offset: int = Query(0, ge=0),
+        auth: None = Auth,
+    ) -> dict:
+        if kind and kind not in SEARCH_KINDS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown kind")
+        items = await database.search(q, kind=kind, limit=limit, offset=offset)
+        next_offset = offset + len(items) if len(items) >= limit else None
+        return {"items": items, "limit": limit, "offset": offset, "next_offset": next_offset}
 
     @router.get("/stats/users")
     async def stats_users(auth: None = Auth) -> dict:
@@ -105,24 +288,111 @@ def build_admin_router(
         week = await database.count_users_last_week()
         return {"total": total, "week": week}
 
+    @router.get("/dashboard")
+    async def dashboard(
+        limit: int = Query(50, ge=1, le=500),
+        dialogs_status: Optional[str] = None,
+        auth: None = Auth,
+        version: None = Versioned(None),
+    ) -> dict:
+        """
+        Всё, что нужно панели для первой отрисовки, одним ответом. Чтения
+        независимы и идут параллельно на пуле читателей.
+        """
+        # курсор берётся до чтения списков: изменение, попавшее между ними,
+        # просто придёт повторно в первом /changes
+        token = await database.changes_token()
+        total, week, submissions, actions, questions, reports, dialogs = await asyncio.gather(
+            database.count_users_all(),
+            database.count_users_last_week(),
+            database.list_submissions(limit=limit),
+            database.list_actions(limit=limit),
+            database.list_questions(limit=limit),
+            database.list_reports(limit=limit),
+            database.list_dialogs(status=dialogs_status, limit=limit),
+        )
+        return {
+            "version": DASHBOARD_VERSION,
+            "changes_token": token,
+            "stats": {"total": total, "week": week},
+            "submissions": _page(submissions, limit, None, None, "submissions"),
+            "actions": _page(actions, limit, None, None, "actions"),
+            "questions": _page(questions, limit, None, None, "questions"),
+            "reports": _page(reports, limit, None, None, "reports"),
+            "dialogs": _page(dialogs, limit, None, None),
+        }
+
+    @router.get("/changes")
+    async def changes(
+        since: Optional[int] = Query(None, ge=0),
+        limit: int = Query(1000, ge=1, le=5000),
+        entities: Optional[str] = None,
+        auth: None = Auth,
+    ) -> dict:
+        """
+        Изменения списков после курсора since (changes_token из /dashboard или token
+        прошлого ответа). entities — списки через запятую, по умолчанию все.
+        has_more — журнал прочитан не до конца, повторите с новым token.
+        reset — курсор устарел, перезагрузите /dashboard.
+        """
+        selected = None
+        if entities:
+            selected = list(dict.fromkeys(name.strip() for name in entities.split(",") if name.strip()))
+            unknown = [name for name in selected if name not in CHANGE_COLUMNS]
+            if unknown:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown entity: {unknown[0]}")
+        if since is None:
+            return {"token": await database.changes_token(), "reset": True, "has_more": False, "changed": {}, "deleted": {}}
+        return await database.get_changes(since, limit=limit, entities=selected)
+
     @router.get("/dialogs")
-    async def list_dialogs(status: Optional[str] = None, limit: int = 50, auth: None = Auth) -> dict:
-        items = await database.list_dialogs(status=status, limit=limit)
-        return {"items": items}
+    async def list_dialogs(
+        status: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=500),
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        auth: None = Auth,
+        version: None = Versioned("dialogs"),
+    ) -> dict:
+        items = await database.list_dialogs(
+            status=status, limit=limit, before_id=before_id, after_id=after_id, user_id=user_id
+        )
+        return _page(items, limit, after_id, before_id)
+
+    def _history_cursor(messages: List[dict], limit: int) -> Optional[int]:
+        # сообщения идут от старых к новым, листаем назад от самого старого
+        return messages[0]["id"] if messages and len(messages) >= limit else None
 
     @router.get("/dialogs/{dialog_id}")
-    async def get_dialog(dialog_id: int, auth: None = Auth) -> dict:
-        dialog = await database.get_dialog(dialog_id)
+    async def get_dialog(dialog_id: int, limit: int = Query(50, ge=1, le=500), auth: None = Auth) -> dict:
+        dialog = await database.get_dialog(dialog_id, limit=limit)
         if not dialog:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dialog not found")
+        if dialog["unread_admin"]:
+            await database.mark_dialog_read(dialog_id)
+        dialog["next_cursor"] = _history_cursor(dialog["messages"], limit)
         return dialog
 
+    @router.get("/dialogs/{dialog_id}/messages")
+    async def get_dialog_messages(
+        dialog_id: int,
+        before_message_id: Optional[int] = None,
+        limit: int = Query(50, ge=1, le=500),
+        auth: None = Auth,
+    ) -> dict:
+        messages = await database.list_dialog_messages(dialog_id, before_message_id=before_message_id, limit=limit)
+        if not messages and not await database.get_dialog_header(dialog_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dialog not found")
+        return {"items": messages, "limit": limit, "next_cursor": _history_cursor(messages, limit)}
+
     @router.post("/dialogs/{dialog_id}/message")
     async def send_dialog_message(dialog_id: int, text: str = Body(..., embed=True), auth: None = Auth) -> dict:
-        dialog = await database.get_dialog(dialog_id)
+        dialog = await database.get_dialog_header(dialog_id)
         if not dialog:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dialog not found")
-        await database.add_dialog_message(dialog_id, "admin", message=text)
+        message_id = await database.add_dialog_message(dialog_id, "admin", message=text)
+        await events.publish_dialog_message(database, message_id)
         try:
             await bot.send_message(chat_id=dialog["user_id"], text=text)
         except Exception as e:
@@ -131,7 +401,7 @@ def build_admin_router(
 
     @router.post("/dialogs/{dialog_id}/prompt_close")
     async def prompt_close(dialog_id: int, auth: None = Auth) -> dict:
-        dialog = await database.get_dialog(dialog_id)
+        dialog = await database.get_dialog_header(dialog_id)
         if not dialog:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dialog not found")
         kb = InlineKeyboardMarkup(
@@ -150,35 +420,83 @@ def build_admin_router(
 
     @router.post("/dialogs/{dialog_id}/delete")
     async def delete_dialog(dialog_id: int, auth: None = Auth) -> dict:
-        dialog = await database.get_dialog(dialog_id)
+        dialog = await database.get_dialog_header(dialog_id)
         if not dialog:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dialog not found")
         if dialog["status"] != "closed":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Dialog not closed")
         await database.delete_dialog(dialog_id)
+        events.publish("dialog_removed", {"id": dialog_id})
         return {"status": "ok"}
 
+    @router.get("/events", include_in_schema=False)
+    async def live_events(auth: None = Auth) -> StreamingResponse:
+        """
+        Поток изменений для админки (Server-Sent Events): новые вопросы, отчёты,
+        заявки, сообщения диалогов и удаления. Раз в 15 секунд — комментарий,
+        чтобы прокси не закрывали простаивающее соединение.
+        """
+
+        async def stream():
+            async with events.subscribe() as queue:
+                yield "retry: 3000\n\n"
+                while True:
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout=15)
+                    except asyncio.TimeoutError:
+                        yield ": ping\n\n"
+                        continue
+                    if event is None:
+                        return
+                    yield event.encode()
+
+        return StreamingResponse(
+            stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     @router.get("/file/{file_id}", include_in_schema=False)
-    async def get_file(file_id: str, auth: None = Auth):
+    async def get_file(
+        file_id: str,
+        range_header: Optional[str] = Header(None, alias="Range"),
+        if_none_match: Optional[str] = Header(None),
+        auth: None = Auth,
+    ):
         try:
-            f = await bot.get_file(file_id)
-        except Exception:
+            cached = await media.get(file_id)
+        except TelegramAPIError:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
-        buffer = io.BytesIO()
-        try:
-            await bot.download_file(f.file_path, destination=buffer)
         except Exception:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to download file")
-        suffix = Path(f.file_path).suffix.lower()
-        media_type = "application/octet-stream"
-        if suffix in {".jpg", ".jpeg"}:
-            media_type = "image/jpeg"
-        elif suffix in {".png"}:
-            media_type = "image/png"
-        elif suffix in {".gif"}:
-            media_type = "image/gif"
-        buffer.seek(0)
-        return StreamingResponse(buffer, media_type=media_type)
+        headers = {
+            "ETag": cached.etag,
+            "Accept-Ranges": "bytes",
+            # содержимое по file_unique_id не меняется
+            "Cache-Control": "private, max-age=86400",
+        }
+        if etag_matches(if_none_match, cached.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        try:
+            byte_range = parse_range(range_header, cached.size)
+        except ValueError:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{cached.size}"},
+            )
+        status_code = status.HTTP_200_OK
+        start, end = 0, cached.size - 1
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+            headers["Content-Range"] = f"bytes {start}-{end}/{cached.size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            iter_file(cached.path, start, end),
+            status_code=status_code,
+            media_type=cached.mime,
+            headers=headers,
+        )
 
     @router.post("/questions/{question_id}/reply")
     async def reply_question(
@@ -196,14 +514,17 @@ def build_admin_router(
             await bot.send_message(chat_id=user_id, text=message)
         except Exception as e:  # noqa: BLE001
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Failed to send: {e}")
-        await database.add_action(
-            action="question_reply",
-            user_id=user_id,
-            username=question.get("username"),
-            details={"question_id": question_id, "message": message},
-        )
-        dialog_id = await database.get_or_create_dialog(user_id, question.get("username"))
-        await database.add_dialog_message(dialog_id, "admin", message=message)
+        async with database.transaction() as tx:
+            await tx.add_action(
+                action="question_reply",
+                user_id=user_id,
+                username=question.get("username"),
+                details={"question_id": question_id, "message": message},
+            )
+            dialog_id = await tx.get_or_create_dialog(user_id, question.get("username"))
+            message_id = await tx.add_dialog_message(dialog_id, "admin", message=message)
+        events.publish("question_removed", {"id": question_id})
+        await events.publish_dialog_message(database, message_id)
         return {"status": "ok"}
 
     @router.post("/reports/{report_id}/reply")
@@ -222,15 +543,18 @@ def build_admin_router(
             await bot.send_message(chat_id=user_id, text=message)
         except Exception as e:  # noqa: BLE001
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Failed to send: {e}")
-        await database.add_action(
-            action="report_reply",
-            user_id=user_id,
-            username=report.get("username"),
-            details={"report_id": report_id, "message": message},
-        )
-        dialog_id = await database.get_or_create_dialog(user_id, report.get("username"))
-        await database.add_dialog_message(dialog_id, "admin", message=message)
-        await database.delete_report(report_id)
+        async with database.transaction() as tx:
+            await tx.add_action(
+                action="report_reply",
+                user_id=user_id,
+                username=report.get("username"),
+                details={"report_id": report_id, "message": message},
+            )
+            dialog_id = await tx.get_or_create_dialog(user_id, report.get("username"))
+            message_id = await tx.add_dialog_message(dialog_id, "admin", message=message)
+            await tx.delete_report(report_id)
+        events.publish("report_removed", {"id": report_id})
+        await events.publish_dialog_message(database, message_id)
         return {"status": "ok"}
 
     @router.post("/broadcast")
@@ -238,22 +562,18 @@ def build_admin_router(
         message: str = Body("", embed=True),
         auth: None = Auth,
     ) -> dict:
-        ids = await database.list_all_user_ids()
-        sent = 0
-        failed = 0
-        for uid in ids:
-            try:
-                await bot.send_message(chat_id=uid, text=message)
-                sent += 1
-            except Exception:
-                failed += 1
-        await database.add_action(
-            action="broadcast",
-            user_id=None,
-            username=None,
-            details={"message": message, "sent": sent, "failed": failed},
-        )
-        return {"status": "ok", "sent": sent, "failed": failed, "total": len(ids)}
+        if not message.strip():
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty message")
+        # рассылка идёт в фоне, прогресс — GET /broadcast/{id}
+        job = await broadcasts.submit(message)
+        return {"status": "ok", "id": job["id"], "total": job["total"]}
+
+    @router.get("/broadcast/{broadcast_id}")
+    async def broadcast_progress(broadcast_id: int, auth: None = Auth) -> dict:
+        job = await database.get_broadcast(broadcast_id)
+        if not job:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Broadcast not found")
+        return job
 
     @router.post("/cards")
     async def add_card(
@@ -274,24 +594,28 @@ def build_admin_router(
 
     @router.post("/questions/{question_id}/reject")
     async def reject_question(question_id: int, auth: None = Auth) -> dict:
-        await database.delete_question(question_id)
-        await database.add_action(
-            action="question_rejected",
-            user_id=None,
-            username=None,
-            details={"question_id": question_id},
-        )
+        async with database.transaction() as tx:
+            await tx.delete_question(question_id)
+            await tx.add_action(
+                action="question_rejected",
+                user_id=None,
+                username=None,
+                details={"question_id": question_id},
+            )
+        events.publish("question_removed", {"id": question_id})
         return {"status": "ok"}
 
     @router.post("/reports/{report_id}/reject")
     async def reject_report(report_id: int, auth: None = Auth) -> dict:
-        await database.delete_report(report_id)
-        await database.add_action(
-            action="report_rejected",
-            user_id=None,
-            username=None,
-            details={"report_id": report_id},
-        )
+        async with database.transaction() as tx:
+            await tx.delete_report(report_id)
+            await tx.add_action(
+                action="report_rejected",
+                user_id=None,
+                username=None,
+                details={"report_id": report_id},
+            )
+        events.publish("report_removed", {"id": report_id})
         return {"status": "ok"}
 
     @router.get("/admin/login", include_in_schema=False)
@@ -306,13 +630,21 @@ def build_admin_router(
         response: Response,
         user_id: str = Form(...),
         password: str = Form(...),
-        pairs=Depends(_require_credentials),
     ) -> RedirectResponse:
-        match = next((p for p in pairs if p[0] == user_id and p[1] == password), None)
-        if not match:
+        if not credentials.configured:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Admin credentials not set",
+            )
+        if not credentials.can_sign:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="ADMIN_SECRET or API_KEY must be set for admin auth",
+            )
+        if not await asyncio.to_thread(credentials.check_password, user_id, password):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-        token = _sign_session(user_id)
+        token = credentials.issue(user_id)
         response = RedirectResponse(url="/admin", status_code=status.HTTP_302_FOUND)
         response.set_cookie(
             key="session",
@@ -320,7 +652,7 @@ def build_admin_router(
             httponly=True,
             secure=False,
             samesite="lax",
-            max_age=60 * 60 * 24 * 7,
+            max_age=credentials.session_ttl,
         )
         return response
 
@@ -331,14 +663,25 @@ def build_admin_router(
         return response
 
     @router.get("/admin", include_in_schema=False)
-    async def admin_page(auth: None = Auth) -> FileResponse:
+    async def admin_page(
+        if_none_match: Optional[str] = Header(None),
+        auth: None = Auth,
+    ) -> Response:
         panel_file = admin_panel_dir / "index.html"
         if not panel_file.exists():
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin page not found")
-        return FileResponse(panel_file)
+        # ссылки на css/js заменены отпечатанными именами, сама страница сверяется по ETag
+        html, etag = assets.page(panel_file)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return HTMLResponse(html, headers=headers)
 
     @router.get("/admin/panel", include_in_schema=False)
-    async def admin_panel(auth: None = Auth) -> FileResponse:
-        return await admin_page(auth=auth)
+    async def admin_panel(
+        if_none_match: Optional[str] = Header(None),
+        auth: None = Auth,
+    ) -> Response:
+        return await admin_page(if_none_match=if_none_match, auth=auth)
 
     return router
@@ -1,18 +1,30 @@
 from pathlib import Path
+from typing import Optional
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
+from aiogram import Bot, Dispatcher
 
+from .assets import StaticAssets
+from .broadcast import BroadcastEngine
+from .compression import CompressionMiddleware
 from .config import Settings
 from .db import Database
+from .events import EventBus
+from .media_cache import MediaCache
 from .admin_routes import build_admin_router
 from .public_routes import build_public_router
+from .webhook_routes import build_webhook_router
 
 
-def create_api(settings: Settings, database: Database) -> FastAPI:
+def create_api(
+    settings: Settings,
+    database: Database,
+    bot: Bot,
+    broadcasts: BroadcastEngine,
+    events: EventBus,
+    dispatcher: Optional[Dispatcher] = None,
+) -> FastAPI:
     app = FastAPI(title="ReferralBot Backend", version="0.1.0")
 
     static_dir = Path(__file__).resolve().parent / "static"
@@ -20,15 +32,24 @@ def create_api(settings: Settings, database: Database) -> FastAPI:
     admin_panel_dir = static_dir / "admin_panel"
     admin_panel_dir.mkdir(parents=True, exist_ok=True)
 
+    # сжатие ответов по Accept-Encoding (gzip, br — если установлен brotli)
+    app.add_middleware(CompressionMiddleware)
+
     app.mount("/static", StaticFiles(directory=static_dir), name="static")
     app.mount("/admin_panel/static", StaticFiles(directory=admin_panel_dir), name="admin_panel_static")
 
-    bot = Bot(
-        token=settings.bot_token,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    media = MediaCache(
+        bot,
+        settings.media_cache_dir,
+        max_bytes=settings.media_cache_mb * 1024 * 1024,
+        path_ttl=settings.file_path_ttl,
     )
 
-    app.include_router(build_public_router())
-    app.include_router(build_admin_router(settings, database, bot, static_dir, admin_panel_dir))
+    assets = StaticAssets(admin_panel_dir, "/admin_panel/static", "/admin_panel/assets")
+
+    app.include_router(build_public_router(assets))
+    app.include_router(build_admin_router(settings, database, bot, static_dir, admin_panel_dir, broadcasts, media, events, assets))
+    if settings.bot_mode == "webhook" and dispatcher is not None:
+        app.include_router(build_webhook_router(settings, dispatcher, bot))
 
     return app
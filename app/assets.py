@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+import mimetypes
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import Response
+
+from .compression import brotli, etag_matches, negotiate_encoding
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@dataclass
+class Asset:
+    name: str
+    mime: str
+    etag: str
+    # кодировка ("identity", "gzip", "br") -> тело
+    bodies: Dict[str, bytes] = field(default_factory=dict)
+
+
+class StaticAssets:
+    """
+    CSS и JS админки, подготовленные при старте. Имя файла получает отпечаток
+    содержимого (app.js -> app.1a2b3c4d5e.js), поэтому ответ кэшируется браузером
+    навсегда (immutable), а новая версия файла приходит под новым именем.
+    Сжатые варианты (gzip и, если установлен пакет brotli, br) готовятся один раз
+    и лежат в памяти. HTML-страницы отдаются с переписанными ссылками на
+    отпечатанные имена и проверяются по ETag при каждом заходе.
+    """
+
+    def __init__(self, directory: Path, source_prefix: str, url_prefix: str, extensions=(".js", ".css")):
+        self.source_prefix = source_prefix.rstrip("/")
+        self.url_prefix = url_prefix.rstrip("/")
+        self._assets: Dict[str, Asset] = {}
+        self._urls: Dict[str, str] = {}
+        self._pages: Dict[Path, Tuple[str, str]] = {}
+        for path in sorted(directory.iterdir()):
+            if path.is_file() and path.suffix in extensions:
+                self._add(path)
+
+    def _add(self, path: Path) -> None:
+        body = path.read_bytes()
+        digest = hashlib.sha256(body).hexdigest()[:10]
+        name = f"{path.stem}.{digest}{path.suffix}"
+        asset = Asset(
+            name=name,
+            mime=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+            etag=f'"{digest}"',
+            bodies={"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)},
+        )
+        if brotli is not None:
+            asset.bodies["br"] = brotli.compress(body, quality=11)
+        self._assets[name] = asset
+        self._urls[f"{self.source_prefix}/{path.name}"] = f"{self.url_prefix}/{name}"
+
+    def page(self, path: Path) -> Tuple[str, str]:
+        """HTML-страница с отпечатанными ссылками на статику и её ETag."""
+        cached = self._pages.get(path)
+        if cached is None:
+            html = path.read_text(encoding="utf-8")
+            for source, url in self._urls.items():
+                html = html.replace(f'"{source}"', f'"{url}"')
+            cached = (html, '"' + hashlib.sha256(html.encode()).hexdigest()[:16] + '"')
+            self._pages[path] = cached
+        return cached
+
+    def response(self, name: str, accept_encoding: str, if_none_match: Optional[str]) -> Optional[Response]:
+        asset = self._assets.get(name)
+        if asset is None:
+            return None
+        headers = {"ETag": asset.etag, "Cache-Control": IMMUTABLE, "Vary": "Accept-Encoding"}
+        if etag_matches(if_none_match, asset.etag):
+            return Response(status_code=304, headers=headers)
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding in asset.bodies:
+            headers["Content-Encoding"] = encoding
+        else:
+            encoding = "identity"
+        return Response(asset.bodies[encoding], media_type=asset.mime, headers=headers)
@@ -0,0 +1,76 @@
+import hashlib
+import hmac
+import os
+import time
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Tuple
+
+from .config import Settings
+
+HASH_ITERATIONS = 100_000
+
+
+def _hash_password(password: str, salt: bytes) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, HASH_ITERATIONS)
+
+
+class CredentialStore:
+    """
+    Логины админки, собранные один раз при старте. Пароли хранятся только как
+    солёные хэши, поиск логина — по словарю. Сессионный токен подписан секретом
+    и содержит срок действия, поэтому проверяется без обращения к спискам и базе.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[str, str]], secret: Optional[str], session_ttl: int):
+        hashes = {}
+        for login, password in pairs:
+            salt = os.urandom(16)
+            hashes[login] = (salt, _hash_password(password, salt))
+        self._hashes: Mapping[str, Tuple[bytes, bytes]] = MappingProxyType(hashes)
+        self._secret = secret.encode() if secret else None
+        self.session_ttl = session_ttl
+        # неизвестный логин проверяется так же долго, как известный
+        self._dummy = (os.urandom(16), b"")
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "CredentialStore":
+        pairs = dict(settings.admin_credentials or [])
+        if settings.admin_panel_user_id and settings.admin_panel_password:
+            pairs.setdefault(str(settings.admin_panel_user_id), settings.admin_panel_password)
+        return cls(
+            pairs.items(),
+            settings.admin_panel_secret or settings.api_key,
+            settings.admin_session_hours * 3600,
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self._hashes)
+
+    @property
+    def can_sign(self) -> bool:
+        return self._secret is not None
+
+    def check_password(self, login: str, password: str) -> bool:
+        """Медленная (PBKDF2) проверка пароля; из async-кода вызывать через to_thread."""
+        salt, expected = self._hashes.get(login, self._dummy)
+        return hmac.compare_digest(_hash_password(password, salt), expected) and login in self._hashes
+
+    def _signature(self, payload: str) -> str:
+        return hmac.new(self._secret, payload.encode(), hashlib.sha256).hexdigest()
+
+    def issue(self, login: str) -> str:
+        payload = f"{login}.{int(time.time()) + self.session_ttl}"
+        return f"{payload}.{self._signature(payload)}"
+
+    def verify(self, token: Optional[str]) -> Optional[str]:
+        """Логин из действительного токена или None."""
+        if not token or self._secret is None:
+            return None
+        payload, _, signature = token.rpartition(".")
+        login, _, expires = payload.rpartition(".")
+        if not login or not expires.isdigit() or int(expires) < time.time():
+            return None
+        if not hmac.compare_digest(self._signature(payload), signature):
+            return None
+        return login if login in self._hashes else None
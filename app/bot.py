@@ -1,9 +1,11 @@
 from typing import Optional
 
-from aiogram import Bot, Dispatcher, F
+from aiogram import Bot, Dispatcher, F, flags
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.types import (
     Message,
     InputFile,
@@ -14,8 +16,12 @@ from aiogram.types import (
     KeyboardButton,
 )
 
+from .action_log import ActionLog
 from .config import Settings
 from .db import Database
+from .events import EventBus
+from .middlewares import ActionEvent, ActionLogMiddleware
+from .routing import RouteTable
 
 
 class SubmissionForm(StatesGroup):
@@ -30,12 +36,33 @@ class ReportForm(StatesGroup):
     report = State()
 
 
+# предел длины подписи к фото в Telegram
+CAPTION_LIMIT = 1024
+# заявок на странице /my
+MY_PAGE_SIZE = 10
+
+
 def _is_admin(user_id: int, settings: Settings) -> bool:
     return user_id in (settings.admin_ids or [])
 
 
-def setup_bot(settings: Settings, database: Database) -> Dispatcher:
-    dp = Dispatcher()
+def setup_bot(
+    settings: Settings,
+    database: Database,
+    action_log: ActionLog,
+    storage: Optional[BaseStorage] = None,
+    events: Optional[EventBus] = None,
+) -> Dispatcher:
+    dp = Dispatcher(storage=storage)
+    # новые вопросы, отчёты и сообщения уходят в админку через шину
+    events = events or EventBus()
+    # кнопки меню и callback_data разбираются одной таблицей; она подключена первой,
+    # поэтому нажатие кнопки срабатывает в любом состоянии FSM, как и раньше
+    routes = RouteTable()
+    routes.attach(dp)
+    # журнал событий пишется после ответа хендлера, имя события — из @flags.action
+    dp.message.middleware(ActionLogMiddleware(action_log))
+    dp.callback_query.middleware(ActionLogMiddleware(action_log))
 
     start_text = (
         "💰 Заработай до нескольких тысяч рублей на реферальной системе известных банков!\n\n"
@@ -76,6 +103,7 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
     bank_18_keys = ["tbank", "mts", "alpha"]
     bank_14_buttons = [BANKS_INFO[k]["display"] for k in bank_14_keys]
     bank_18_buttons = [BANKS_INFO[k]["display"] for k in bank_18_keys]
+    bank_by_display = {BANKS_INFO[k]["display"]: k for k in dict.fromkeys(bank_14_keys + bank_18_keys)}
     next_keyboard = InlineKeyboardMarkup(
         inline_keyboard=[[InlineKeyboardButton(text=next_button_text, callback_data="next_submit")]]
     )
@@ -145,10 +173,11 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
 
     async def clear_state_keep_age(state: FSMContext) -> None:
         data = await state.get_data()
-        age = data.get("preferred_age")
+        # возраст и текущее меню переживают сброс сценария
+        kept = {k: data[k] for k in ("preferred_age", "menu_msg_id", "menu_kind") if data.get(k)}
         await state.clear()
-        if age:
-            await state.update_data(preferred_age=age)
+        if kept:
+            await state.update_data(**kept)
 
     def _special_banks():
         return {k: v for k, v in BANKS_INFO.items() if k in {"alpha", "tbank"}}
@@ -163,17 +192,46 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
             except Exception:
                 pass
 
+    async def _edit_menu(msg_obj: Message, kind: str, text: str, reply_markup) -> bool:
+        """Правит меню на месте; False — править нельзя, нужно отправить заново."""
+        if kind == "photo" and len(text) > CAPTION_LIMIT:
+            return False
+        try:
+            if kind == "photo":
+                await msg_obj.edit_caption(caption=text, reply_markup=reply_markup)
+            else:
+                await msg_obj.edit_text(text, reply_markup=reply_markup)
+        except TelegramBadRequest as e:
+            # то же содержимое: меню уже в нужном виде
+            return "message is not modified" in str(e)
+        return True
+
     async def _send_menu(obj, state: FSMContext, text: str, reply_markup=None):
+        """
+        Показывает меню. Если нажата кнопка на текущем меню, сообщение редактируется
+        (текст или подпись к фото, смотря по menu_kind) — один вызов API вместо
+        удаления и отправки. Иначе старое меню удаляется и отправляется новое.
+        Reply-клавиатуру к отредактированному сообщению не прикрепить, с ней всегда отправка.
+        """
         msg_obj = obj.message if isinstance(obj, CallbackQuery) else obj
+        data = await state.get_data()
+        if (
+            isinstance(obj, CallbackQuery)
+            and data.get("menu_msg_id") == msg_obj.message_id
+            and not isinstance(reply_markup, ReplyKeyboardMarkup)
+            and await _edit_menu(msg_obj, data.get("menu_kind", "text"), text, reply_markup)
+        ):
+            return
         await _clear_menu_message(state, msg_obj)
         sent = await msg_obj.answer(text, reply_markup=reply_markup)
-        await state.update_data(menu_msg_id=sent.message_id)
+        await state.update_data(menu_msg_id=sent.message_id, menu_kind="text")
 
-    async def _append_dialog_message(user, text: str, file_id: Optional[str] = None):
+    async def _append_dialog_message(user, text: str, file_id: Optional[str] = None) -> Optional[int]:
         if not user:
-            return
-        dialog_id = await database.get_or_create_dialog(user.id, user.username)
-        await database.add_dialog_message(dialog_id, "user", message=text or "", file_id=file_id)
+            return None
+        async with database.transaction() as tx:
+            dialog_id = await tx.get_or_create_dialog(user.id, user.username)
+            return await tx.add_dialog_message(dialog_id, "user", message=text or "", file_id=file_id)
 
     def _instruction_text(bank_name: str, link: str, custom: Optional[str] = None) -> str:
         if custom == "tbank":
@@ -226,30 +284,16 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
             f"ВАЖНО❗️: Покупка, сделанная онлайн, не будет засчитана."
         )
 
-    async def _show_banks_by_age(state: FSMContext, obj) -> None:
+    async def _show_banks_by_age(state: FSMContext, obj, action_event: ActionEvent) -> None:
         data = await state.get_data()
         age_label = data.get("preferred_age")
         if age_label:
-            await _store_age_and_show(age_label, obj, state)
+            await _store_age_and_show(age_label, obj, state, action_event)
         else:
             await _send_menu(obj, state, "Выберите ваш возраст:", reply_markup=age_inline_keyboard())
             if isinstance(obj, CallbackQuery):
                 await obj.answer()
 
-    async def _send_menu(obj, state: FSMContext, text: str, reply_markup=None):
-        # удаляем предыдущее меню, если было
-        data = await state.get_data()
-        last_id = data.get("menu_msg_id")
-        msg_obj = obj.message if isinstance(obj, CallbackQuery) else obj
-        chat_id = msg_obj.chat.id
-        if last_id:
-            try:
-                await msg_obj.bot.delete_message(chat_id=chat_id, message_id=last_id)
-            except Exception:
-                pass
-        sent = await msg_obj.answer(text, reply_markup=reply_markup)
-        await state.update_data(menu_msg_id=sent.message_id)
-
     async def show_tasks_or_main(obj, state: FSMContext) -> None:
         data = await state.get_data()
         preferred_age = data.get("preferred_age")
@@ -306,28 +350,23 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         if settings.start_photo_file_id:
             sent = await message.answer_photo(photo=settings.start_photo_file_id, caption=start_text, reply_markup=next_keyboard)
             photo_sent = True
-            await state.update_data(menu_msg_id=sent.message_id)
+            await state.update_data(menu_msg_id=sent.message_id, menu_kind="photo")
         elif settings.start_photo_path:
             try:
                 sent = await message.answer_photo(photo=InputFile(settings.start_photo_path), caption=start_text, reply_markup=next_keyboard)
                 photo_sent = True
-                await state.update_data(menu_msg_id=sent.message_id)
+                await state.update_data(menu_msg_id=sent.message_id, menu_kind="photo")
             except FileNotFoundError:
                 photo_sent = False
         if not photo_sent:
             await _send_menu(message, state, start_text, reply_markup=next_keyboard)
 
     @dp.message(CommandStart())
+    @flags.action("start")
     async def handle_start(message: Message, state: FSMContext) -> None:
-        await database.add_action(
-            action="start",
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            details={},
-        )
         await send_start(message, state)
 
-    @dp.callback_query(F.data == "next_submit")
+    @routes.callback("next_submit")
     async def handle_next(call, state: FSMContext):
         await clear_state_keep_age(state)
         await call.message.answer(
@@ -336,7 +375,7 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         )
         await call.answer()
 
-    @dp.message(F.text == next_button_text)
+    @routes.message(next_button_text)
     async def handle_next_text(message: Message, state: FSMContext) -> None:
         step_text = (
             "🧱 Как ты зарабатываешь деньги — шаг за шагом:\n\n"
@@ -376,76 +415,49 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
             if isinstance(message_obj, CallbackQuery):
                 await message_obj.answer()
 
-    @dp.message(F.text == start_earn_button)
+    @routes.message(start_earn_button)
+    @flags.action("start_earn")
     async def handle_start_earn(message: Message, state: FSMContext) -> None:
-        await database.add_action(
-            action="start_earn",
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            details={},
-        )
         await state.set_state(None)
         await _show_tasks(message, state)
 
-    @dp.callback_query(F.data == "start_earn")
+    @routes.callback("start_earn")
+    @flags.action("start_earn")
     async def handle_start_earn_cb(call: CallbackQuery, state: FSMContext) -> None:
-        await database.add_action(
-            action="start_earn",
-            user_id=call.from_user.id if call.from_user else None,
-            username=call.from_user.username if call.from_user else None,
-            details={},
-        )
         await state.set_state(None)
         await _show_tasks(call, state)
 
-    def _get_user_obj(obj):
-        if isinstance(obj, CallbackQuery):
-            return obj.from_user
-        if isinstance(obj, Message):
-            return obj.from_user
-        return None
-
-    async def _store_age_and_show(age_label: str, message_obj, state: FSMContext) -> None:
+    async def _store_age_and_show(age_label: str, message_obj, state: FSMContext, action_event: ActionEvent) -> None:
         data = await state.get_data()
         data["preferred_age"] = age_label
         await state.set_state(None)
         await state.set_data(data)
-        u = _get_user_obj(message_obj)
-        await database.add_action(
-            action="age_selected",
-            user_id=u.id if u else None,
-            username=u.username if u else None,
-            details={"age": age_label},
-        )
+        action_event.action = "age_selected"
+        action_event.details["age"] = age_label
         kb = banks_inline_keyboard(age_label)
         prompt = "Доступные задания для 14+:" if age_label == "14+" else "Доступные задания для 18+:"
         await _send_menu(message_obj, state, prompt, reply_markup=kb)
         if isinstance(message_obj, CallbackQuery):
             await message_obj.answer()
 
-    @dp.message(F.text == age_14_button)
-    async def handle_age_14(message: Message, state: FSMContext) -> None:
-        await _store_age_and_show("14+", message, state)
+    @routes.message(age_14_button)
+    async def handle_age_14(message: Message, state: FSMContext, action_event: ActionEvent) -> None:
+        await _store_age_and_show("14+", message, state, action_event)
 
-    @dp.message(F.text == age_18_button)
-    async def handle_age_18(message: Message, state: FSMContext) -> None:
-        await _store_age_and_show("18+", message, state)
+    @routes.message(age_18_button)
+    async def handle_age_18(message: Message, state: FSMContext, action_event: ActionEvent) -> None:
+        await _store_age_and_show("18+", message, state, action_event)
 
-    @dp.message(F.text == ask_button)
+    @routes.message(ask_button)
+    @flags.action("ask_question_start")
     async def handle_question(message: Message, state: FSMContext) -> None:
-        await database.add_action(
-            action="ask_question_start",
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            details={},
-        )
         await state.set_state(SupportForm.question)
         await message.answer(
             "Напиши свой вопрос или отправь файл/скрин. После отправки вопрос будет сохранен для админов.",
             reply_markup=cancel_support_keyboard,
         )
 
-    async def _handle_bank_selection(obj, state: FSMContext, bank_key: str) -> None:
+    async def _handle_bank_selection(obj, state: FSMContext, bank_key: str, action_event: ActionEvent) -> None:
         info = BANKS_INFO.get(bank_key)
         special = _special_banks()
         if bank_key in special and info:
@@ -475,56 +487,42 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         display = info["display"] if info else bank_key
         await state.update_data(bank=display)
         await state.set_state(SubmissionForm.comment)
-        u = _get_user_obj(obj)
-        await database.add_action(
-            action="bank_selected",
-            user_id=u.id if u else None,
-            username=u.username if u else None,
-            details={"bank": display},
-        )
+        action_event.action = "bank_selected"
+        action_event.details["bank"] = display
         await _send_menu(obj, state, "Добавь комментарий или условия (можно пропустить, отправив '-'):")
 
-    @dp.message(F.text.in_(bank_14_buttons + bank_18_buttons))
-    async def handle_bank_shortcut(message: Message, state: FSMContext) -> None:
-        bank_key = next((k for k, v in BANKS_INFO.items() if v["display"] == message.text.strip()), None)
-        if not bank_key:
-            await message.answer("Не удалось распознать банк. Попробуй снова.")
-            return
-        await _handle_bank_selection(message, state, bank_key)
+    @routes.message(*bank_by_display)
+    async def handle_bank_shortcut(message: Message, state: FSMContext, action_event: ActionEvent) -> None:
+        await _handle_bank_selection(message, state, bank_by_display[message.text], action_event)
 
-    @dp.message(F.text == emoji_button)
+    @routes.message(emoji_button)
+    @flags.action("emoji_clicked")
     async def handle_emoji(message: Message) -> None:
-        await database.add_action(
-            action="emoji_clicked",
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            details={},
-        )
         await message.answer("Выбери задание или задай вопрос.", reply_markup=age_inline_keyboard())
 
-    @dp.message(F.text == other_tasks_button)
+    @routes.message(other_tasks_button)
     async def handle_other_tasks(message: Message) -> None:
         await message.answer("Скоро добавим новые задания. Пока выбери из доступных или задай вопрос.")
 
-    @dp.message(F.text == tasks_button)
+    @routes.message(tasks_button)
     async def handle_tasks_menu(message: Message, state: FSMContext) -> None:
         await _show_tasks(message, state)
 
-    @dp.callback_query(F.data == "age_14")
-    async def handle_age_14_cb(call: CallbackQuery, state: FSMContext) -> None:
-        await _store_age_and_show("14+", call, state)
+    @routes.callback("age_14")
+    async def handle_age_14_cb(call: CallbackQuery, state: FSMContext, action_event: ActionEvent) -> None:
+        await _store_age_and_show("14+", call, state, action_event)
 
-    @dp.callback_query(F.data == "age_18")
-    async def handle_age_18_cb(call: CallbackQuery, state: FSMContext) -> None:
-        await _store_age_and_show("18+", call, state)
+    @routes.callback("age_18")
+    async def handle_age_18_cb(call: CallbackQuery, state: FSMContext, action_event: ActionEvent) -> None:
+        await _store_age_and_show("18+", call, state, action_event)
 
-    @dp.callback_query(F.data.startswith("bank::"))
-    async def handle_bank_cb(call: CallbackQuery, state: FSMContext) -> None:
+    @routes.callback_prefix("bank")
+    async def handle_bank_cb(call: CallbackQuery, state: FSMContext, action_event: ActionEvent) -> None:
         bank_key = call.data.split("::", 1)[1]
-        await _handle_bank_selection(call, state, bank_key)
+        await _handle_bank_selection(call, state, bank_key, action_event)
         await call.answer()
 
-    @dp.callback_query(F.data.startswith("start_task::"))
+    @routes.callback_prefix("start_task")
     async def handle_start_task(call: CallbackQuery, state: FSMContext) -> None:
         bank_key = call.data.split("::", 1)[1]
         info = _special_banks().get(bank_key)
@@ -541,12 +539,11 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         await _send_menu(call, state, text, reply_markup=kb)
         await call.answer()
 
-    @dp.callback_query(F.data == "refuse_task")
-    async def handle_refuse_task(call: CallbackQuery, state: FSMContext) -> None:
-        await _show_banks_by_age(state, call)
-        await call.answer()
+    @routes.callback("refuse_task")
+    async def handle_refuse_task(call: CallbackQuery, state: FSMContext, action_event: ActionEvent) -> None:
+        await _show_banks_by_age(state, call, action_event)
 
-    @dp.callback_query(F.data == "card_ordered")
+    @routes.callback("card_ordered")
     async def handle_card_ordered(call: CallbackQuery, state: FSMContext) -> None:
         await _send_menu(
             call,
@@ -556,35 +553,25 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         )
         await call.answer()
 
-    @dp.callback_query(F.data.startswith("switch_age::"))
-    async def handle_switch_age(call: CallbackQuery, state: FSMContext) -> None:
+    @routes.callback_prefix("switch_age")
+    async def handle_switch_age(call: CallbackQuery, state: FSMContext, action_event: ActionEvent) -> None:
         _, target_age = call.data.split("::", 1)
-        await _store_age_and_show(target_age, call, state)
+        await _store_age_and_show(target_age, call, state, action_event)
 
-    @dp.callback_query(F.data == "emoji")
+    @routes.callback("emoji")
+    @flags.action("emoji_clicked")
     async def handle_emoji_cb(call: CallbackQuery) -> None:
-        await database.add_action(
-            action="emoji_clicked",
-            user_id=call.from_user.id if call.from_user else None,
-            username=call.from_user.username if call.from_user else None,
-            details={},
-        )
         await call.message.answer("Выбери возраст и задание.", reply_markup=age_inline_keyboard())
         await call.answer()
 
-    @dp.callback_query(F.data == "other_tasks")
+    @routes.callback("other_tasks")
     async def handle_other_tasks_cb(call: CallbackQuery) -> None:
         await call.message.answer("Скоро добавим новые задания. Пока выбери из доступных или задай вопрос.")
         await call.answer()
 
-    @dp.callback_query(F.data == "ask")
+    @routes.callback("ask")
+    @flags.action("ask_question_start")
     async def handle_ask_cb(call: CallbackQuery, state: FSMContext) -> None:
-        await database.add_action(
-            action="ask_question_start",
-            user_id=call.from_user.id if call.from_user else None,
-            username=call.from_user.username if call.from_user else None,
-            details={},
-        )
         await clear_state_keep_age(state)
         await _send_menu(
             call,
@@ -594,7 +581,7 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         )
         await call.answer()
 
-    @dp.callback_query(F.data == "start_support")
+    @routes.callback("start_support")
     async def handle_start_support(call: CallbackQuery, state: FSMContext) -> None:
         await state.set_state(SupportForm.question)
         await _send_menu(
@@ -605,7 +592,7 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         )
         await call.answer()
 
-    @dp.callback_query(F.data == "start_report_message")
+    @routes.callback("start_report_message")
     async def handle_start_report_message(call: CallbackQuery, state: FSMContext) -> None:
         await state.set_state(ReportForm.report)
         await _send_menu(
@@ -621,40 +608,41 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         )
         await call.answer()
 
-    @dp.callback_query(F.data == "go_main")
+    @routes.callback("go_main")
     async def handle_go_main(call: CallbackQuery, state: FSMContext) -> None:
         await clear_state_keep_age(state)
         await _send_menu(call, state, "Главное меню:", reply_markup=main_menu_reply)
         await call.answer()
 
-    @dp.callback_query(F.data == "cancel_support")
+    @routes.callback("cancel_support")
     async def handle_cancel_support(call: CallbackQuery, state: FSMContext) -> None:
         await clear_state_keep_age(state)
         await show_tasks_or_main(call, state)
 
-    @dp.callback_query(F.data == "cancel_report")
+    @routes.callback("cancel_report")
     async def handle_cancel_report(call: CallbackQuery, state: FSMContext) -> None:
         await clear_state_keep_age(state)
         await show_tasks_or_main(call, state)
 
-    @dp.callback_query(F.data.startswith("dialog_close_yes::"))
+    @routes.callback_prefix("dialog_close_yes")
     async def handle_dialog_close_yes(call: CallbackQuery) -> None:
         dialog_id = int(call.data.split("::", 1)[1])
         await database.set_dialog_status(dialog_id, "closed")
+        await events.publish_row("dialog", lambda: database.get_dialog_header(dialog_id))
         await call.message.edit_text("Диалог закрыт. Спасибо!")
         await call.answer("Закрыто")
 
-    @dp.callback_query(F.data.startswith("dialog_close_no::"))
+    @routes.callback_prefix("dialog_close_no")
     async def handle_dialog_close_no(call: CallbackQuery) -> None:
         dialog_id = int(call.data.split("::", 1)[1])
         await database.set_dialog_status(dialog_id, "open")
+        await events.publish_row("dialog", lambda: database.get_dialog_header(dialog_id))
         await call.message.edit_text("Диалог остаётся открытым, продолжаем общение.")
         await call.answer("Оставлен открытым")
 
-    @dp.callback_query(F.data == "back_to_banks")
-    async def handle_back_to_banks(call: CallbackQuery, state: FSMContext) -> None:
-        await _show_banks_by_age(state, call)
-        await call.answer()
+    @routes.callback("back_to_banks")
+    async def handle_back_to_banks(call: CallbackQuery, state: FSMContext, action_event: ActionEvent) -> None:
+        await _show_banks_by_age(state, call, action_event)
 
     def _profile_text(obj) -> str:
         u = obj.from_user if isinstance(obj, CallbackQuery) else obj.from_user
@@ -667,7 +655,7 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
             lines.append("Нет данных пользователя")
         return "\n".join(lines)
 
-    @dp.callback_query(F.data == "menu_profile")
+    @routes.callback("menu_profile")
     async def handle_profile_cb(call: CallbackQuery) -> None:
         back_kb = InlineKeyboardMarkup(
             inline_keyboard=[[InlineKeyboardButton(text="⬅️ Назад", callback_data="go_main")]]
@@ -675,14 +663,9 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         await call.message.answer(_profile_text(call), reply_markup=back_kb)
         await call.answer()
 
-    @dp.callback_query(F.data == "menu_referral")
+    @routes.callback("menu_referral")
+    @flags.action("referral_open")
     async def handle_referral_cb(call: CallbackQuery) -> None:
-        await database.add_action(
-            action="referral_open",
-            user_id=call.from_user.id if call.from_user else None,
-            username=call.from_user.username if call.from_user else None,
-            details={},
-        )
         back_kb = InlineKeyboardMarkup(
             inline_keyboard=[[InlineKeyboardButton(text="⬅️ Назад", callback_data="go_main")]]
         )
@@ -694,21 +677,16 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         )
         await call.answer()
 
-    @dp.message(F.text == profile_button)
+    @routes.message(profile_button)
     async def handle_profile_msg(message: Message) -> None:
         back_kb = InlineKeyboardMarkup(
             inline_keyboard=[[InlineKeyboardButton(text="⬅️ Назад", callback_data="go_main")]]
         )
         await message.answer(_profile_text(message), reply_markup=back_kb)
 
-    @dp.message(F.text == referral_button)
+    @routes.message(referral_button)
+    @flags.action("referral_open")
     async def handle_referral_msg(message: Message) -> None:
-        await database.add_action(
-            action="referral_open",
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            details={},
-        )
         back_kb = InlineKeyboardMarkup(
             inline_keyboard=[[InlineKeyboardButton(text="⬅️ Назад", callback_data="go_main")]]
         )
@@ -719,28 +697,18 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
             reply_markup=back_kb,
         )
 
-    @dp.message(F.text == support_button)
+    @routes.message(support_button)
+    @flags.action("support_open")
     async def handle_support_msg(message: Message, state: FSMContext) -> None:
-        await database.add_action(
-            action="support_open",
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            details={},
-        )
         await clear_state_keep_age(state)
         await message.answer(
             "Техподдержка. Нажми «✉️ Написать сообщение», затем отправь текст или файл. Можно отменить.",
             reply_markup=start_support_keyboard,
         )
 
-    @dp.message(F.text == report_card_button)
+    @routes.message(report_card_button)
+    @flags.action("report_card")
     async def handle_report_card_msg(message: Message, state: FSMContext) -> None:
-        await database.add_action(
-            action="report_card",
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            details={},
-        )
         await clear_state_keep_age(state)
         await message.answer(
             "👉Если УЖЕ получил карту\n"
@@ -752,11 +720,7 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
             reply_markup=start_report_keyboard,
         )
 
-    @dp.message(F.text == tasks_button)
-    async def handle_tasks_msg(message: Message, state: FSMContext) -> None:
-        await _show_tasks(message, state)
-
-    @dp.message(F.text == reviews_button)
+    @routes.message(reviews_button)
     async def handle_reviews_msg(message: Message) -> None:
         back_kb = InlineKeyboardMarkup(
             inline_keyboard=[[InlineKeyboardButton(text="⬅️ Назад", callback_data="go_main")]]
@@ -766,14 +730,9 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
             reply_markup=back_kb,
         )
 
-    @dp.callback_query(F.data == "menu_support")
+    @routes.callback("menu_support")
+    @flags.action("support_open")
     async def handle_support_cb(call: CallbackQuery, state: FSMContext) -> None:
-        await database.add_action(
-            action="support_open",
-            user_id=call.from_user.id if call.from_user else None,
-            username=call.from_user.username if call.from_user else None,
-            details={},
-        )
         await clear_state_keep_age(state)
         await call.message.answer(
             "Хотите начать диалог с администрацией?",
@@ -781,14 +740,9 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         )
         await call.answer()
 
-    @dp.callback_query(F.data == "menu_report_card")
+    @routes.callback("menu_report_card")
+    @flags.action("report_card")
     async def handle_report_card_cb(call: CallbackQuery, state: FSMContext) -> None:
-        await database.add_action(
-            action="report_card",
-            user_id=call.from_user.id if call.from_user else None,
-            username=call.from_user.username if call.from_user else None,
-            details={},
-        )
         await clear_state_keep_age(state)
         await call.message.answer(
             "При получении карты вы можете подтвердить это и следовать дальнейшей инструкции.",
@@ -796,7 +750,7 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         )
         await call.answer()
 
-    @dp.callback_query(F.data == "menu_tasks")
+    @routes.callback("menu_tasks")
     async def handle_tasks_cb(call: CallbackQuery, state: FSMContext) -> None:
         data = await state.get_data()
         preferred_age = data.get("preferred_age")
@@ -806,7 +760,7 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
             await _send_menu(call, state, "Выберите ваш возраст:", reply_markup=age_inline_keyboard())
         await call.answer()
 
-    @dp.callback_query(F.data == "menu_reviews")
+    @routes.callback("menu_reviews")
     async def handle_reviews_cb(call: CallbackQuery) -> None:
         back_kb = InlineKeyboardMarkup(
             inline_keyboard=[[InlineKeyboardButton(text="⬅️ Назад", callback_data="go_main")]]
@@ -861,19 +815,22 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
         bank = data.get("bank")
         comment = data.get("comment")
 
-        submission_id = await database.add_submission(
-            user_id=message.from_user.id if message.from_user else 0,
-            username=message.from_user.username if message.from_user else None,
-            bank=bank,
-            comment=comment,
-            file_id=file_id,
-        )
-        await database.add_action(
-            action="submission_created",
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            details={"submission_id": submission_id, "bank": bank},
-        )
+        # заявка и запись о ней в журнале коммитятся вместе
+        async with database.transaction() as tx:
+            submission_id = await tx.add_submission(
+                user_id=message.from_user.id if message.from_user else 0,
+                username=message.from_user.username if message.from_user else None,
+                bank=bank,
+                comment=comment,
+                file_id=file_id,
+            )
+            await tx.add_action(
+                action="submission_created",
+                user_id=message.from_user.id if message.from_user else None,
+                username=message.from_user.username if message.from_user else None,
+                details={"submission_id": submission_id, "bank": bank},
+            )
+        await events.publish_row("submission", lambda: database.get_submission(submission_id))
         await clear_state_keep_age(state)
         await message.answer(
             "Заявка отправлена! Мы свяжемся с тобой после проверки.\n"
@@ -898,52 +855,28 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
             await message.answer("Отправь текст или прикрепи файл/фото.")
             return
 
-        await database.add_question(
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            message=text or "",
-            file_id=file_id,
-        )
-        await _append_dialog_message(message.from_user, text or "", file_id=file_id)
-        await database.add_action(
-            action="question_submitted",
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            details={"file_id": file_id},
-        )
+        async with database.transaction() as tx:
+            question_id = await tx.add_question(
+                user_id=message.from_user.id if message.from_user else None,
+                username=message.from_user.username if message.from_user else None,
+                message=text or "",
+                file_id=file_id,
+            )
+            message_id = await _append_dialog_message(message.from_user, text or "", file_id=file_id)
+            await tx.add_action(
+                action="question_submitted",
+                user_id=message.from_user.id if message.from_user else None,
+                username=message.from_user.username if message.from_user else None,
+                details={"file_id": file_id},
+            )
+        # публикуем после коммита: админка сразу может открыть запись
+        await events.publish_row("question", lambda: database.get_question(question_id))
+        if message_id is not None:
+            await events.publish_dialog_message(database, message_id)
         await clear_state_keep_age(state)
         await message.answer("Вопрос сохранен, админ скоро ответит.", reply_markup=after_send_keyboard)
 
     # Report flow
-    @dp.message(F.text == report_card_button)
-    async def handle_report_card_msg(message: Message, state: FSMContext) -> None:
-        await database.add_action(
-            action="report_card",
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            details={},
-        )
-        await clear_state_keep_age(state)
-        await message.answer(
-            "При получении карты вы можете подтвердить это и следовать дальнейшей инструкции.",
-            reply_markup=start_report_keyboard,
-        )
-
-    @dp.callback_query(F.data == "menu_report_card")
-    async def handle_report_card_cb(call: CallbackQuery, state: FSMContext) -> None:
-        await database.add_action(
-            action="report_card",
-            user_id=call.from_user.id if call.from_user else None,
-            username=call.from_user.username if call.from_user else None,
-            details={},
-        )
-        await clear_state_keep_age(state)
-        await call.message.answer(
-            "Сообщи о получении карты. Нажми «✉️ Написать сообщение», затем отправь текст или скрин.",
-            reply_markup=start_report_keyboard,
-        )
-        await call.answer()
-
     @dp.message(ReportForm.report, F.text | F.photo | F.document)
     async def handle_report_payload(message: Message, state: FSMContext) -> None:
         file_id: Optional[str] = None
@@ -961,37 +894,63 @@ def setup_bot(settings: Settings, database: Database) -> Dispatcher:
             await message.answer("Отправь текст или прикрепи файл/фото.")
             return
 
-        await database.add_report(
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            message=text or "",
-            file_id=file_id,
-        )
-        await database.add_action(
-            action="report_submitted",
-            user_id=message.from_user.id if message.from_user else None,
-            username=message.from_user.username if message.from_user else None,
-            details={"file_id": file_id},
-        )
+        async with database.transaction() as tx:
+            report_id = await tx.add_report(
+                user_id=message.from_user.id if message.from_user else None,
+                username=message.from_user.username if message.from_user else None,
+                message=text or "",
+                file_id=file_id,
+            )
+            await tx.add_action(
+                action="report_submitted",
+                user_id=message.from_user.id if message.from_user else None,
+                username=message.from_user.username if message.from_user else None,
+                details={"file_id": file_id},
+            )
+        await events.publish_row("report", lambda: database.get_report(report_id))
         await clear_state_keep_age(state)
         await message.answer("Отчет принят, спасибо! Админ проверит и свяжется.", reply_markup=after_send_keyboard)
 
+    async def _my_page(user_id: int, cursor: Optional[int]):
+        # берём на одну заявку больше, чтобы понять, есть ли следующая страница
+        items = await database.list_submissions_for_user(user_id, cursor=cursor, limit=MY_PAGE_SIZE + 1)
+        has_more = len(items) > MY_PAGE_SIZE
+        items = items[:MY_PAGE_SIZE]
+        if not items:
+            return None, None
+        lines = [
+            f"#{item['id']} • {item['bank']} • статус: {item['status']} • отправлено {item['created_at']}"
+            for item in items
+        ]
+        buttons = []
+        if cursor is not None:
+            buttons.append(InlineKeyboardButton(text="⏮ К новым", callback_data="my::"))
+        if has_more:
+            buttons.append(InlineKeyboardButton(text="Старее ▶️", callback_data=f"my::{items[-1]['id']}"))
+        kb = InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+        return "\n".join(lines), kb
+
     @dp.message(Command("my"))
     async def handle_my(message: Message) -> None:
-        submissions = await database.list_submissions(limit=10)
-        user_subs = [
-            s for s in submissions if s["user_id"] == (message.from_user.id if message.from_user else None)
-        ]
-        if not user_subs:
+        if not message.from_user:
+            return
+        text, kb = await _my_page(message.from_user.id, None)
+        if not text:
             await message.answer("У тебя пока нет заявок. Попробуй команду /submit.")
             return
-
-        lines = []
-        for item in user_subs:
-            lines.append(
-                f"#{item['id']} • {item['bank']} • статус: {item['status']} • отправлено {item['created_at']}"
-            )
-        await message.answer("\n".join(lines))
+        await message.answer(text, reply_markup=kb)
+
+    @routes.callback_prefix("my")
+    async def handle_my_page(call: CallbackQuery) -> None:
+        raw = call.data.split("::", 1)[1]
+        cursor = int(raw) if raw.isdigit() else None
+        text, kb = await _my_page(call.from_user.id, cursor)
+        if text:
+            try:
+                await call.message.edit_text(text, reply_markup=kb)
+            except TelegramBadRequest:
+                pass
+        await call.answer()
 
     @dp.message(Command("actions"))
     async def handle_actions(message: Message) -> None:
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+)
+
+from .action_log import ActionLog
+from .db import Database
+
+logger = logging.getLogger(__name__)
+
+Result = Tuple[int, str, Optional[str]]
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты: rate токенов в секунду, запас до capacity.
+    pause() останавливает выдачу для всех воркеров — так обрабатывается RetryAfter.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = 0.0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        loop = asyncio.get_running_loop()
+        self._paused_until = max(self._paused_until, loop.time() + seconds)
+        # за время паузы токены не копятся: после неё снова ровно rate в секунду
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        # под замком ждёт только один воркер, остальные встают в очередь за ним
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self._updated:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BroadcastEngine:
+    """
+    Фоновые рассылки. Задание и статус каждого получателя лежат в broadcasts /
+    broadcast_recipients; пул воркеров шлёт сообщения не быстрее rate в секунду,
+    итоги пишутся в базу пачками. Незавершённые рассылки продолжаются после
+    перезапуска с неотправленных получателей (сообщение, отправленное прямо
+    перед падением, может уйти повторно).
+
+    Рассылку шлёт только процесс, взявший её аренду (claim_broadcast): реплики
+    API с общей базой не продолжают одно задание вдвоём. Аренда продлевается,
+    пока задание идёт; рассылку упавшего процесса после истечения аренды
+    подхватывает любой живой.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        bot: Bot,
+        action_log: ActionLog,
+        workers: int = 8,
+        rate: float = 25.0,
+        max_attempts: int = 3,
+        page_size: int = 500,
+        flush_interval: float = 1.0,
+        lease_seconds: int = 60,
+    ):
+        self.database = database
+        self.bot = bot
+        self.action_log = action_log
+        self.workers = max(1, workers)
+        self.bucket = TokenBucket(rate)
+        self.max_attempts = max(1, max_attempts)
+        self.page_size = page_size
+        self.flush_interval = flush_interval
+        self.lease_seconds = max(1, lease_seconds)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._jobs: Dict[int, asyncio.Task] = {}
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Продолжает свободные рассылки, прерванные остановкой процесса, и следит за чужими."""
+        await self._resume()
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def close(self) -> None:
+        if self._watcher:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        jobs = dict(self._jobs)
+        for task in jobs.values():
+            task.cancel()
+        # задания сохраняют накопленные итоги при отмене
+        await asyncio.gather(*jobs.values(), return_exceptions=True)
+        self._jobs.clear()
+        for broadcast_id in jobs:
+            await self.database.release_broadcast(broadcast_id, self.owner)
+
+    async def submit(self, message: str) -> Dict[str, int]:
+        job = await self.database.create_broadcast(message, owner=self.owner, lease_seconds=self.lease_seconds)
+        self._spawn(job["id"])
+        return job
+
+    async def _resume(self) -> None:
+        for broadcast_id in await self.database.list_running_broadcasts():
+            if broadcast_id in self._jobs:
+                continue
+            if await self.database.claim_broadcast(broadcast_id, self.owner, self.lease_seconds):
+                self._spawn(broadcast_id)
+
+    async def _watch(self) -> None:
+        # рассылка процесса, упавшего без release, освобождается по истечении аренды
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                await self._resume()
+            except Exception:  # noqa: BLE001
+                logger.exception("Failed to resume broadcasts")
+
+    def _spawn(self, broadcast_id: int) -> None:
+        if broadcast_id in self._jobs:
+            return
+        task = asyncio.create_task(self._run(broadcast_id))
+        self._jobs[broadcast_id] = task
+
+        def _done(task: asyncio.Task) -> None:
+            self._jobs.pop(broadcast_id, None)
+            if not task.cancelled() and task.exception():
+                # рассылка остаётся running: её продолжит процесс, взявший аренду после истечения
+                logger.error("Broadcast %s stopped", broadcast_id, exc_info=task.exception())
+
+        task.add_done_callback(_done)
+
+    async def _run(self, broadcast_id: int) -> None:
+        job = await self.database.get_broadcast(broadcast_id)
+        if not job:
+            return
+        queue: "asyncio.Queue[Optional[int]]" = asyncio.Queue(maxsize=self.page_size)
+        results: List[Result] = []
+        workers = [asyncio.create_task(self._worker(job["message"], queue, results)) for _ in range(self.workers)]
+        flusher = asyncio.create_task(self._flush_loop(broadcast_id, results))
+        try:
+            # ниже любого id: получатели из старых рассылок с user_id = 0 тоже выбираются
+            last_user_id = -1
+            while True:
+                page = await self.database.next_broadcast_recipients(broadcast_id, last_user_id, self.page_size)
+                if not page:
+                    break
+                for user_id in page:
+                    await queue.put(user_id)
+                last_user_id = page[-1]
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in (*workers, flusher):
+                task.cancel()
+            await asyncio.gather(*workers, flusher, return_exceptions=True)
+            await self._flush(broadcast_id, results)
+
+        if not await self.database.finish_broadcast(broadcast_id):
+            # рассылка остаётся running и дообработается при следующем запуске
+            logger.warning("Broadcast %s has pending recipients left", broadcast_id)
+            return
+        job = await self.database.get_broadcast(broadcast_id) or job
+        await self.action_log.add_action(
+            action="broadcast",
+            user_id=None,
+            username=None,
+            details={"broadcast_id": broadcast_id, "message": job["message"], "sent": job["sent"], "failed": job["failed"]},
+        )
+        logger.info("Broadcast %s finished: sent=%s failed=%s", broadcast_id, job["sent"], job["failed"])
+
+    async def _worker(self, message: str, queue: "asyncio.Queue[Optional[int]]", results: List[Result]) -> None:
+        while True:
+            user_id = await queue.get()
+            if user_id is None:
+                return
+            results.append(await self._deliver(user_id, message))
+
+    async def _deliver(self, user_id: int, message: str) -> Result:
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id=user_id, text=message)
+                return user_id, "sent", None
+            except TelegramRetryAfter as e:
+                # флуд-контроль касается всего бота: притормаживаем все воркеры, попытку не считаем
+                self.bucket.pause(e.retry_after)
+            except TelegramForbiddenError as e:
+                return user_id, "failed", e.message
+            except TelegramNetworkError as e:
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    return user_id, "failed", e.message
+                await asyncio.sleep(2 ** attempt)
+            except TelegramAPIError as e:
+                return user_id, "failed", e.message
+
+    async def _flush_loop(self, broadcast_id: int, results: List[Result]) -> None:
+        loop = asyncio.get_running_loop()
+        renewed = loop.time()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush(broadcast_id, results)
+            # продлеваем заранее, с запасом в две трети аренды
+            if loop.time() - renewed < self.lease_seconds / 3:
+                continue
+            try:
+                claimed = await self.database.claim_broadcast(broadcast_id, self.owner, self.lease_seconds)
+            except Exception:  # noqa: BLE001
+                logger.exception("Failed to renew broadcast %s lease", broadcast_id)
+                continue
+            if not claimed:
+                # аренда истекла и рассылку взял другой процесс: дальше шлёт он
+                logger.warning("Broadcast %s lease lost, stopping", broadcast_id)
+                task = self._jobs.get(broadcast_id)
+                if task:
+                    task.cancel()
+                return
+            renewed = loop.time()
+
+    async def _flush(self, broadcast_id: int, results: List[Result]) -> None:
+        if not results:
+            return
+        batch = results[:]
+        del results[: len(batch)]
+        try:
+            await self.database.record_broadcast_results(broadcast_id, batch)
+        except asyncio.CancelledError:
+            # повторная запись безопасна: обновляются только строки в статусе pending
+            results[:0] = batch
+            raise
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to record %d broadcast results", len(batch))
+            results[:0] = batch
@@ -0,0 +1,166 @@
+import zlib
+from typing import Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него клиенты получают gzip
+    brotli = None
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# что имеет смысл сжимать; картинки и архивы уже сжаты, поток SSE должен уходить сразу
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/css",
+    "text/csv",
+    "text/plain",
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Лучшее из поддерживаемых сжатий, которое принимает клиент (br предпочтительнее gzip)."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Слабое сравнение из If-None-Match: сжатый ответ несёт W/-версию того же тега."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == bare:
+            return True
+    return False
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits=31 — формат gzip
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы gzip или brotli по Accept-Encoding клиента. Трогает только
+    ответы 200 текстовых типов без своего Content-Encoding: заранее сжатая
+    статика, файлы, диапазоны и 304 проходят как есть. Ответ целиком меньше
+    minimum_size не сжимается; потоковые ответы сжимаются по мере отдачи.
+    Сильный ETag сжатого ответа становится слабым: байты другие, содержимое то же.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+                passthrough = (
+                    message["status"] != 200
+                    or "content-encoding" in headers
+                    or content_type not in COMPRESSIBLE_TYPES
+                )
+                if passthrough:
+                    await send(message)
+                    start = None
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                # решение принимается по первому куску тела
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                encoder = _Encoder(encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Encoding"] = encoding
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = "W/" + etag
+                if more_body:
+                    del headers["Content-Length"]
+                    await send(start)
+                    start = None
+                else:
+                    compressed = encoder.compress(body) + encoder.finish()
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start)
+                    start = None
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+            chunk = encoder.compress(body)
+            if not more_body:
+                chunk += encoder.finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,3 +1,4 @@
+import hashlib
 import os
 from dataclasses import dataclass
 from typing import List, Optional
@@ -62,13 +63,33 @@ class Settings:
     api_port: int = 8080
     api_key: Optional[str] = None
     database_path: str = "data/bot.db"
+    database_readers: int = 4
+    action_flush_ms: int = 500
+    action_batch_size: int = 200
+    action_queue_size: int = 10000
+    fsm_cache_size: int = 1000
+    fsm_ttl_hours: int = 168
     admin_ids: Optional[List[int]] = None
     admin_panel_user_id: Optional[int] = None  # legacy: одиночный логин
     admin_panel_password: Optional[str] = None  # legacy: одиночный пароль
     admin_credentials: Optional[List[tuple]] = None  # список пар логин/пароль
     admin_panel_secret: Optional[str] = None
+    admin_session_hours: int = 168
     start_photo_file_id: Optional[str] = None
     start_photo_path: Optional[str] = None
+    telegram_pool_size: int = 100  # одновременных соединений к Bot API
+    telegram_keepalive: float = 30.0  # сек., сколько держать простаивающее соединение
+    telegram_dns_ttl: int = 300
+    telegram_timeout: float = 30.0  # таймаут запроса к Bot API
+    media_cache_dir: str = "data/media"
+    media_cache_mb: int = 512
+    file_path_ttl: int = 3600  # сек., Telegram гарантирует ссылку на файл минимум на час
+    broadcast_rate: float = 25.0  # сообщений в секунду, лимит Telegram — 30
+    broadcast_workers: int = 8
+    bot_mode: str = "polling"  # polling | webhook
+    webhook_url: Optional[str] = None  # публичный адрес API, например https://bot.example.com
+    webhook_path: str = "/telegram/webhook"
+    webhook_secret: Optional[str] = None
 
     @classmethod
     def load(cls) -> "Settings":
@@ -79,24 +100,69 @@ class Settings:
         api_port = int(os.getenv("API_PORT", "8080"))
         api_key = os.getenv("API_KEY")
         database_path = os.getenv("DATABASE_PATH", "data/bot.db")
+        database_readers = int(os.getenv("DATABASE_READERS", "4"))
+        action_flush_ms = int(os.getenv("ACTION_FLUSH_MS", "500"))
+        action_batch_size = int(os.getenv("ACTION_BATCH_SIZE", "200"))
+        action_queue_size = int(os.getenv("ACTION_QUEUE_SIZE", "10000"))
+        fsm_cache_size = int(os.getenv("FSM_CACHE_SIZE", "1000"))
+        fsm_ttl_hours = int(os.getenv("FSM_TTL_HOURS", "168"))
         admin_ids = _parse_admins(os.getenv("ADMIN_IDS"))
         admin_panel_user_id = _parse_single_int(os.getenv("ADMIN_USER_ID"))
         admin_panel_password = os.getenv("ADMIN_PASSWORD")
         admin_credentials = _parse_admin_credentials(os.getenv("ADMIN_USERS"))
         admin_panel_secret = os.getenv("ADMIN_SECRET")
+        admin_session_hours = int(os.getenv("ADMIN_SESSION_HOURS", "168"))
         start_photo_file_id = os.getenv("START_PHOTO_FILE_ID")
         start_photo_path = os.getenv("START_PHOTO_PATH")
+        telegram_pool_size = int(os.getenv("TELEGRAM_POOL_SIZE", "100"))
+        telegram_keepalive = float(os.getenv("TELEGRAM_KEEPALIVE", "30"))
+        telegram_dns_ttl = int(os.getenv("TELEGRAM_DNS_TTL", "300"))
+        telegram_timeout = float(os.getenv("TELEGRAM_TIMEOUT", "30"))
+        media_cache_dir = os.getenv("MEDIA_CACHE_DIR", "data/media")
+        media_cache_mb = int(os.getenv("MEDIA_CACHE_MB", "512"))
+        file_path_ttl = int(os.getenv("FILE_PATH_TTL", "3600"))
+        broadcast_rate = float(os.getenv("BROADCAST_RATE", "25"))
+        broadcast_workers = int(os.getenv("BROADCAST_WORKERS", "8"))
+        bot_mode = os.getenv("BOT_MODE", "polling").strip().lower()
+        if bot_mode not in {"polling", "webhook"}:
+            raise RuntimeError("BOT_MODE must be 'polling' or 'webhook'")
+        webhook_url = os.getenv("WEBHOOK_URL")
+        if bot_mode == "webhook" and not webhook_url:
+            raise RuntimeError("WEBHOOK_URL is required when BOT_MODE=webhook")
+        webhook_path = "/" + os.getenv("WEBHOOK_PATH", "/telegram/webhook").strip("/")
+        # без явного секрета выводим его из токена: у всех реплик он совпадёт
+        webhook_secret = os.getenv("WEBHOOK_SECRET") or hashlib.sha256(bot_token.encode()).hexdigest()
         return cls(
             bot_token=bot_token,
             api_host=api_host,
             api_port=api_port,
             api_key=api_key,
             database_path=database_path,
+            database_readers=database_readers,
+            action_flush_ms=action_flush_ms,
+            action_batch_size=action_batch_size,
+            action_queue_size=action_queue_size,
+            fsm_cache_size=fsm_cache_size,
+            fsm_ttl_hours=fsm_ttl_hours,
             admin_ids=admin_ids,
             admin_panel_user_id=admin_panel_user_id,
             admin_panel_password=admin_panel_password,
             admin_credentials=admin_credentials,
             admin_panel_secret=admin_panel_secret,
+            admin_session_hours=admin_session_hours,
             start_photo_file_id=start_photo_file_id,
             start_photo_path=start_photo_path,
+            telegram_pool_size=telegram_pool_size,
+            telegram_keepalive=telegram_keepalive,
+            telegram_dns_ttl=telegram_dns_ttl,
+            telegram_timeout=telegram_timeout,
+            media_cache_dir=media_cache_dir,
+            media_cache_mb=media_cache_mb,
+            file_path_ttl=file_path_ttl,
+            broadcast_rate=broadcast_rate,
+            broadcast_workers=broadcast_workers,
+            bot_mode=bot_mode,
+            webhook_url=webhook_url,
+            webhook_path=webhook_path,
+            webhook_secret=webhook_secret,
         )
@@ -1,86 +1,254 @@
+import asyncio
+import base64
+import binascii
 import json
 import os
-from typing import Any, Dict, List, Optional
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
 import aiosqlite
 
+from .migrations import run_migrations
+
+
+# таблицы, доступные для выгрузки, и их колонки в порядке выдачи
+EXPORT_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "actions": ("id", "user_id", "username", "action", "details", "created_at"),
+    "submissions": ("id", "user_id", "username", "bank", "comment", "file_id", "status", "created_at"),
+}
+
+# списки админки, изменения которых отдаёт /changes, и колонки их строк (как в list_*)
+CHANGE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    **EXPORT_COLUMNS,
+    "questions": ("id", "user_id", "username", "message", "file_id", "created_at"),
+    "reports": ("id", "user_id", "username", "message", "file_id", "created_at"),
+    "dialogs": (
+        "id", "user_id", "username", "status", "created_at", "updated_at",
+        "last_message", "last_message_at", "message_count", "unread_admin",
+    ),
+}
+
+# ключи сортировки списков админки и колонки порядка для каждого; id в конце
+# делает порядок однозначным. У каждого ключа есть индекс (m0010, m0011), у
+# фильтров-равенств — индекс (<колонка>, created_at). "-ключ" — по убыванию
+LIST_SORTS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "submissions": {
+        "created_at": ("created_at", "id"),
+        "bank": ("bank", "created_at", "id"),
+        "status": ("status", "created_at", "id"),
+    },
+    "actions": {"created_at": ("created_at", "id")},
+    "questions": {"created_at": ("created_at", "id")},
+    "reports": {"created_at": ("created_at", "id")},
+}
+DEFAULT_SORT = "-created_at"
+
+# текущее unix-время по часам SQLite: аренды рассылок сравниваются по одним часам
+UNIX_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+class CursorError(ValueError):
+    """Курсор списка не разобран или его запись удалена."""
+
+
+def list_cursor(table: str, sort: str, item: Dict[str, Any]) -> str:
+    """
+    Курсор после строки item: значения её колонок порядка (см. LIST_SORTS) вместе
+    с id. Позиция хранится в самом курсоре, поэтому он остаётся точным, даже если
+    запись потом удалят или изменят.
+    """
+    order = LIST_SORTS[table][sort.lstrip("-")]
+    payload = json.dumps([item[column] for column in order], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _preferred_age(action: str, details: str) -> Optional[str]:
+    # возраст, выбранный пользователем, кэшируется в users.preferred_age
+    if action != "age_selected":
+        return None
+    try:
+        return json.loads(details or "{}").get("age")
+    except (ValueError, AttributeError):
+        return None
+
+
+def _keyset(
+    before_id: Optional[int],
+    after_id: Optional[int],
+    conditions: Optional[List[str]] = None,
+    params: Optional[List[Any]] = None,
+    key: str = "id",
+) -> Tuple[str, List[Any], bool]:
+    """
+    Условие и порядок для курсорной пагинации по индексу.
+    before_id — страница старше курсора, after_id — новее.
+    Возвращает (WHERE ... ORDER BY ..., параметры, ascending); при ascending=True
+    строки нужно развернуть, чтобы выдача всегда шла от новых к старым.
+    """
+    conditions = list(conditions or [])
+    params = list(params or [])
+    if before_id is not None:
+        conditions.append(f"{key} < ?")
+        params.append(before_id)
+    if after_id is not None:
+        conditions.append(f"{key} > ?")
+        params.append(after_id)
+    ascending = after_id is not None and before_id is None
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = "ASC" if ascending else "DESC"
+    return f"{where} ORDER BY {key} {order} LIMIT ?", params, ascending
+
+
+SEARCH_KINDS = ("question", "report", "dialog")
+
+
+def _fts_query(text: str) -> str:
+    """
+    Превращает пользовательский ввод в безопасный запрос FTS5:
+    каждое слово — отдельный префиксный терм, спецсимволы синтаксиса не работают.
+    """
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"*' for term in terms if term)
+
+
+# соединение открытой транзакции (Database, conn) в текущей задаче asyncio
+_current_tx: ContextVar[Optional[Tuple["Database", aiosqlite.Connection]]] = ContextVar(
+    "database_transaction", default=None
+)
+
 
 class Database:
-    def __init__(self, path: str):
+    """
+    Пул соединений SQLite: одно соединение на запись и несколько на чтение.
+    Соединения открываются один раз в init_db() и закрываются в close().
+    """
+
+    def __init__(self, path: str, readers: int = 4):
         self.path = path
+        self.readers = max(1, readers)
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._reader_pool: "asyncio.Queue[aiosqlite.Connection]" = asyncio.Queue()
+        self._reader_conns: List[aiosqlite.Connection] = []
 
-    async def connect(self) -> aiosqlite.Connection:
+    async def connect(self, readonly: bool = False) -> aiosqlite.Connection:
         os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
         conn = await aiosqlite.connect(self.path)
-        await conn.execute("PRAGMA foreign_keys = ON;")
+        await conn.executescript(
+            """
+            PRAGMA foreign_keys = ON;
+            PRAGMA busy_timeout = 5000;
+            PRAGMA synchronous = NORMAL;
+            PRAGMA cache_size = -16000; -- ~16 МБ на соединение
+            PRAGMA temp_store = MEMORY;
+            """
+        )
+        if readonly:
+            await conn.executescript("PRAGMA query_only = ON;")
         return conn
 
-    async def init_db(self) -> None:
-        db = await self.connect()
+    async def open(self) -> None:
+        if self._writer is not None:
+            return
+        self._writer = await self.connect()
+        # WAL позволяет читателям работать параллельно с писателем
+        await self._writer.executescript("PRAGMA journal_mode = WAL;")
+        for _ in range(self.readers):
+            conn = await self.connect(readonly=True)
+            self._reader_conns.append(conn)
+            self._reader_pool.put_nowait(conn)
+
+    async def close(self) -> None:
+        for conn in self._reader_conns:
+            await conn.close()
+        self._reader_conns.clear()
+        self._reader_pool = asyncio.Queue()
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    @asynccontextmanager
+    async def _read(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._writer is None:
+            raise RuntimeError("Database is not opened, call init_db() first")
+        conn = await self._reader_pool.get()
         try:
-            await db.executescript(
-                """
-                CREATE TABLE IF NOT EXISTS submissions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    username TEXT,
-                    bank TEXT NOT NULL,
-                    comment TEXT,
-                    file_id TEXT,
-                    status TEXT DEFAULT 'pending',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                );
-
-                CREATE TABLE IF NOT EXISTS actions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    username TEXT,
-                    action TEXT NOT NULL,
-                    details TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                );
-
-                CREATE TABLE IF NOT EXISTS questions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    username TEXT,
-                    message TEXT,
-                    file_id TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                );
-
-                CREATE TABLE IF NOT EXISTS reports (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    username TEXT,
-                    message TEXT,
-                    file_id TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                );
-
-                CREATE TABLE IF NOT EXISTS dialogs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    username TEXT,
-                    status TEXT DEFAULT 'open',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                );
-
-                CREATE TABLE IF NOT EXISTS dialog_messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    dialog_id INTEGER NOT NULL,
-                    direction TEXT NOT NULL, -- 'user' or 'admin'
-                    message TEXT,
-                    file_id TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(dialog_id) REFERENCES dialogs(id) ON DELETE CASCADE
-                );
-                """
-            )
-            await db.commit()
+            yield conn
         finally:
-            await db.close()
+            self._reader_pool.put_nowait(conn)
+
+    def _active_tx(self) -> Optional[aiosqlite.Connection]:
+        tx = _current_tx.get()
+        if tx is not None and tx[0] is self:
+            return tx[1]
+        return None
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator["Database"]:
+        """
+        Единица работы: все записи внутри блока идут одной транзакцией и одним коммитом.
+
+            async with database.transaction() as tx:
+                await tx.add_submission(...)
+                await tx.add_action(...)
+
+        Блокировка записи держится до конца блока, поэтому внутри не должно быть
+        сетевых вызовов. Чтения через пул не видят незакоммиченные изменения блока.
+        Вложенный transaction() присоединяется к внешнему.
+        """
+        if self._active_tx() is not None:
+            yield self
+            return
+        async with self._write() as conn:
+            token = _current_tx.set((self, conn))
+            try:
+                yield self
+            finally:
+                _current_tx.reset(token)
+
+    @asynccontextmanager
+    async def _write(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._writer is None:
+            raise RuntimeError("Database is not opened, call init_db() first")
+        active = self._active_tx()
+        if active is not None:
+            # внутри transaction(): коммит или откат сделает внешний блок
+            yield active
+            return
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            await self._writer.commit()
+
+    @staticmethod
+    async def _touch_users(db: aiosqlite.Connection, rows: Sequence[Tuple[Any, ...]]) -> None:
+        """
+        Обновляет таблицу users в текущей транзакции.
+        rows: (user_id, username, preferred_age, seen_at); seen_at=None — текущее время.
+        """
+        rows = [row for row in rows if row[0] is not None]
+        if not rows:
+            return
+        await db.executemany(
+            """
+            INSERT INTO users (user_id, username, preferred_age, first_seen, last_seen)
+            VALUES (?1, ?2, ?3, COALESCE(?4, CURRENT_TIMESTAMP), COALESCE(?4, CURRENT_TIMESTAMP))
+            ON CONFLICT(user_id) DO UPDATE SET
+                username = COALESCE(excluded.username, users.username),
+                preferred_age = COALESCE(excluded.preferred_age, users.preferred_age),
+                last_seen = MAX(users.last_seen, excluded.last_seen)
+            """,
+            rows,
+        )
+
+    async def init_db(self) -> None:
+        await self.open()
+        async with self._write() as db:
+            await run_migrations(db)
 
     async def add_submission(
         self,
@@ -90,8 +258,7 @@ class Database:
         comment: Optional[str],
         file_id: Optional[str],
     ) -> int:
-        db = await self.connect()
-        try:
+        async with self._write() as db:
             cursor = await db.execute(
                 """
                 INSERT INTO submissions (user_id, username, bank, comment, file_id)
@@ -99,39 +266,167 @@ class Database:
                 """,
                 (user_id, username, bank, comment, file_id),
             )
-            await db.commit()
+            await self._touch_users(db, [(user_id, username, None, None)])
             return cursor.lastrowid
-        finally:
-            await db.close()
 
-    async def list_submissions(self, limit: int = 50) -> List[Dict[str, Any]]:
-        db = await self.connect()
+    @staticmethod
+    async def _cursor_position(
+        db: aiosqlite.Connection,
+        table: str,
+        order: Tuple[str, ...],
+        cursor: Any,
+    ) -> Tuple[Any, ...]:
+        if isinstance(cursor, int) or str(cursor).isdigit():
+            result = await db.execute(f"SELECT {', '.join(order)} FROM {table} WHERE id = ?", (int(cursor),))
+            row = await result.fetchone()
+            if row is None:
+                raise CursorError("Cursor expired")
+            return tuple(row)
         try:
+            raw = str(cursor)
+            position = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise CursorError("Invalid cursor")
+        if not isinstance(position, list) or len(position) != len(order) or not isinstance(position[-1], int):
+            raise CursorError("Invalid cursor")
+        return tuple(position)
+
+    async def _list_page(
+        self,
+        table: str,
+        columns: Sequence[str],
+        filters: Dict[str, Any],
+        date_from: Optional[str],
+        date_to: Optional[str],
+        sort: str,
+        limit: int,
+        before_id: Optional[Any],
+        after_id: Optional[Any],
+    ) -> List[Tuple[Any, ...]]:
+        """
+        Страница списка с фильтрами-равенствами (None — без фильтра), диапазоном
+        created_at [date_from, date_to) и сортировкой из LIST_SORTS.
+        before_id — страница после курсора в порядке выдачи, after_id — перед ним.
+        Курсор — строка из list_cursor с позицией в порядке выдачи или голый id
+        записи; её позиция читается по первичному ключу, удалённая — CursorError.
+        Позиция сравнивается кортежем (ключ, ..., id), как в list_dialogs, поэтому
+        страница — поиск по индексу.
+        """
+        descending = sort.startswith("-")
+        order = LIST_SORTS[table][sort.lstrip("-")]
+        conditions = [f"{column} = ?" for column, value in filters.items() if value is not None]
+        params: List[Any] = [value for value in filters.values() if value is not None]
+        async with self._read() as db:
+            bounds = []
+            for cursor, forward in ((before_id, True), (after_id, False)):
+                if cursor is None:
+                    continue
+                position = await self._cursor_position(db, table, order, cursor)
+                bounds.append(("<" if forward == descending else ">", position))
+            # при сортировке по дате курсор и граница периода ограничивают одну колонку:
+            # остаётся более строгое из двух, иначе SQLite ищет по индексу только по одному
+            for op, position in list(bounds):
+                if order[0] != "created_at" or position[0] is None:
+                    continue
+                if op == "<" and date_to:
+                    if position[0] < date_to:
+                        date_to = None
+                    else:
+                        bounds.remove((op, position))
+                if op == ">" and date_from:
+                    if position[0] >= date_from:
+                        date_from = None
+                    else:
+                        bounds.remove((op, position))
+            if date_from:
+                conditions.append("created_at >= ?")
+                params.append(date_from)
+            if date_to:
+                conditions.append("created_at < ?")
+                params.append(date_to)
+            for op, position in bounds:
+                conditions.append(f"({', '.join(order)}) {op} ({', '.join('?' * len(order))})")
+                params.extend(position)
+            ascending = after_id is not None and before_id is None
+            direction = "ASC" if ascending == descending else "DESC"
+            query = f"SELECT {', '.join(columns)} FROM {table}"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY " + ", ".join(f"{column} {direction}" for column in order) + " LIMIT ?"
+            result = await db.execute(query, (*params, limit))
+            rows = await result.fetchall()
+        if ascending:
+            rows.reverse()
+        return rows
+
+    async def list_submissions(
+        self,
+        limit: int = 50,
+        before_id: Optional[Any] = None,
+        after_id: Optional[Any] = None,
+        bank: Optional[str] = None,
+        status: Optional[str] = None,
+        user_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        sort: str = DEFAULT_SORT,
+    ) -> List[Dict[str, Any]]:
+        columns = EXPORT_COLUMNS["submissions"]
+        rows = await self._list_page(
+            "submissions",
+            columns,
+            {"bank": bank, "status": status, "user_id": user_id},
+            date_from,
+            date_to,
+            sort,
+            limit,
+            before_id,
+            after_id,
+        )
+        return [dict(zip(columns, row)) for row in rows]
+
+    async def get_submission(self, submission_id: int) -> Optional[Dict[str, Any]]:
+        async with self._read() as db:
             cursor = await db.execute(
                 """
                 SELECT id, user_id, username, bank, comment, file_id, status, created_at
-                FROM submissions
-                ORDER BY created_at DESC
-                LIMIT ?
+                FROM submissions WHERE id = ?
                 """,
-                (limit,),
+                (submission_id,),
             )
-            rows = await cursor.fetchall()
+            row = await cursor.fetchone()
+            if not row:
+                return None
+            return {
+                "id": row[0],
+                "user_id": row[1],
+                "username": row[2],
+                "bank": row[3],
+                "comment": row[4],
+                "file_id": row[5],
+                "status": row[6],
+                "created_at": row[7],
+            }
+
+    async def list_submissions_for_user(
+        self,
+        user_id: int,
+        cursor: Optional[int] = None,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """Заявки пользователя от новых к старым; cursor — id, старше которого нужна страница."""
+        tail, params, _ = _keyset(cursor, None, ["user_id = ?"], [user_id])
+        async with self._read() as db:
+            # идёт по индексу idx_submissions_user (user_id, id): цена страницы не зависит от объёма таблицы
+            result = await db.execute(
+                "SELECT id, bank, comment, status, created_at FROM submissions" + tail,
+                (*params, limit),
+            )
+            rows = await result.fetchall()
             return [
-                {
-                    "id": row[0],
-                    "user_id": row[1],
-                    "username": row[2],
-                    "bank": row[3],
-                    "comment": row[4],
-                    "file_id": row[5],
-                    "status": row[6],
-                    "created_at": row[7],
-                }
+                {"id": row[0], "bank": row[1], "comment": row[2], "status": row[3], "created_at": row[4]}
                 for row in rows
             ]
-        finally:
-            await db.close()
 
     async def add_action(
         self,
@@ -141,8 +436,7 @@ class Database:
         details: Optional[Dict[str, Any]] = None,
     ) -> int:
         serialized = json.dumps(details or {})
-        db = await self.connect()
-        try:
+        async with self._write() as db:
             cursor = await db.execute(
                 """
                 INSERT INTO actions (user_id, username, action, details)
@@ -150,37 +444,54 @@ class Database:
                 """,
                 (user_id, username, action, serialized),
             )
-            await db.commit()
+            await self._touch_users(db, [(user_id, username, _preferred_age(action, serialized), None)])
             return cursor.lastrowid
-        finally:
-            await db.close()
 
-    async def list_actions(self, limit: int = 50) -> List[Dict[str, Any]]:
-        db = await self.connect()
-        try:
-            cursor = await db.execute(
+    async def add_actions(self, rows: Sequence[Tuple[Optional[int], Optional[str], str, str, str]]) -> None:
+        """Пакетная вставка: (user_id, username, action, details_json, created_at)."""
+        async with self._write() as db:
+            await db.executemany(
                 """
-                SELECT id, user_id, username, action, details, created_at
-                FROM actions
-                ORDER BY created_at DESC
-                LIMIT ?
+                INSERT INTO actions (user_id, username, action, details, created_at)
+                VALUES (?, ?, ?, ?, ?)
                 """,
-                (limit,),
+                rows,
+            )
+            await self._touch_users(
+                db,
+                [
+                    (user_id, username, _preferred_age(action, details), created_at)
+                    for user_id, username, action, details, created_at in rows
+                ],
             )
-            rows = await cursor.fetchall()
-            return [
-                {
-                    "id": row[0],
-                    "user_id": row[1],
-                    "username": row[2],
-                    "action": row[3],
-                    "details": json.loads(row[4] or "{}"),
-                    "created_at": row[5],
-                }
-                for row in rows
-            ]
-        finally:
-            await db.close()
+
+    async def list_actions(
+        self,
+        limit: int = 50,
+        before_id: Optional[Any] = None,
+        after_id: Optional[Any] = None,
+        action: Optional[str] = None,
+        user_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        sort: str = DEFAULT_SORT,
+    ) -> List[Dict[str, Any]]:
+        columns = EXPORT_COLUMNS["actions"]
+        rows = await self._list_page(
+            "actions",
+            columns,
+            {"action": action, "user_id": user_id},
+            date_from,
+            date_to,
+            sort,
+            limit,
+            before_id,
+            after_id,
+        )
+        items = [dict(zip(columns, row)) for row in rows]
+        for item in items:
+            item["details"] = json.loads(item["details"] or "{}")
+        return items
 
     async def add_question(
         self,
@@ -189,8 +500,7 @@ class Database:
         message: str,
         file_id: Optional[str] = None,
     ) -> int:
-        db = await self.connect()
-        try:
+        async with self._write() as db:
             cursor = await db.execute(
                 """
                 INSERT INTO questions (user_id, username, message, file_id)
@@ -198,14 +508,11 @@ class Database:
                 """,
                 (user_id, username, message, file_id),
             )
-            await db.commit()
+            await self._touch_users(db, [(user_id, username, None, None)])
             return cursor.lastrowid
-        finally:
-            await db.close()
 
     async def get_question(self, question_id: int) -> Optional[Dict[str, Any]]:
-        db = await self.connect()
-        try:
+        async with self._read() as db:
             cursor = await db.execute(
                 """
                 SELECT id, user_id, username, message, file_id, created_at
@@ -224,43 +531,26 @@ class Database:
                 "file_id": row[4],
                 "created_at": row[5],
             }
-        finally:
-            await db.close()
 
     async def delete_question(self, question_id: int) -> None:
-        db = await self.connect()
-        try:
+        async with self._write() as db:
             await db.execute("DELETE FROM questions WHERE id = ?", (question_id,))
-            await db.commit()
-        finally:
-            await db.close()
 
-    async def list_questions(self, limit: int = 50) -> List[Dict[str, Any]]:
-        db = await self.connect()
-        try:
-            cursor = await db.execute(
-                """
-                SELECT id, user_id, username, message, file_id, created_at
-                FROM questions
-                ORDER BY created_at DESC
-                LIMIT ?
-                """,
-                (limit,),
-            )
-            rows = await cursor.fetchall()
-            return [
-                {
-                    "id": row[0],
-                    "user_id": row[1],
-                    "username": row[2],
-                    "message": row[3],
-                    "file_id": row[4],
-                    "created_at": row[5],
-                }
-                for row in rows
-            ]
-        finally:
-            await db.close()
+    async def list_questions(
+        self,
+        limit: int = 50,
+        before_id: Optional[Any] = None,
+        after_id: Optional[Any] = None,
+        user_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        sort: str = DEFAULT_SORT,
+    ) -> List[Dict[str, Any]]:
+        columns = CHANGE_COLUMNS["questions"]
+        rows = await self._list_page(
+            "questions", columns, {"user_id": user_id}, date_from, date_to, sort, limit, before_id, after_id
+        )
+        return [dict(zip(columns, row)) for row in rows]
 
     async def add_report(
         self,
@@ -269,8 +559,7 @@ class Database:
         message: Optional[str],
         file_id: Optional[str] = None,
     ) -> int:
-        db = await self.connect()
-        try:
+        async with self._write() as db:
             cursor = await db.execute(
                 """
                 INSERT INTO reports (user_id, username, message, file_id)
@@ -278,22 +567,15 @@ class Database:
                 """,
                 (user_id, username, message, file_id),
             )
-            await db.commit()
+            await self._touch_users(db, [(user_id, username, None, None)])
             return cursor.lastrowid
-        finally:
-            await db.close()
 
     async def delete_report(self, report_id: int) -> None:
-        db = await self.connect()
-        try:
+        async with self._write() as db:
             await db.execute("DELETE FROM reports WHERE id = ?", (report_id,))
-            await db.commit()
-        finally:
-            await db.close()
 
     async def get_report(self, report_id: int) -> Optional[Dict[str, Any]]:
-        db = await self.connect()
-        try:
+        async with self._read() as db:
             cursor = await db.execute(
                 """
                 SELECT id, user_id, username, message, file_id, created_at
@@ -312,108 +594,218 @@ class Database:
                 "file_id": row[4],
                 "created_at": row[5],
             }
-        finally:
-            await db.close()
 
-    async def list_reports(self, limit: int = 50) -> List[Dict[str, Any]]:
-        db = await self.connect()
-        try:
-            cursor = await db.execute(
-                """
-                SELECT id, user_id, username, message, file_id, created_at
-                FROM reports
-                ORDER BY created_at DESC
-                LIMIT ?
-                """,
-                (limit,),
-            )
+    async def list_reports(
+        self,
+        limit: int = 50,
+        before_id: Optional[Any] = None,
+        after_id: Optional[Any] = None,
+        user_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        sort: str = DEFAULT_SORT,
+    ) -> List[Dict[str, Any]]:
+        columns = CHANGE_COLUMNS["reports"]
+        rows = await self._list_page(
+            "reports", columns, {"user_id": user_id}, date_from, date_to, sort, limit, before_id, after_id
+        )
+        return [dict(zip(columns, row)) for row in rows]
+
+    async def iter_export(
+        self,
+        table: str,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[List[Tuple[Any, ...]]]:
+        """
+        Отдаёт строки таблицы пачками по возрастанию id.
+        Каждая пачка — отдельный короткий запрос по курсору id, соединение из пула
+        берётся только на время пачки: память постоянна, запись в WAL не блокируется.
+        """
+        columns = EXPORT_COLUMNS.get(table)
+        if columns is None:
+            raise ValueError(f"Table {table!r} is not exportable")
+        conditions: List[str] = ["id > ?"]
+        params: List[Any] = []
+        if date_from:
+            conditions.append("created_at >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("created_at < ?")
+            params.append(date_to)
+        query = (
+            f"SELECT {', '.join(columns)} FROM {table} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY id ASC LIMIT ?"
+        )
+        last_id = 0
+        while True:
+            async with self._read() as db:
+                cursor = await db.execute(query, (last_id, *params, batch_size))
+                rows = await cursor.fetchall()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    async def search(
+        self,
+        text: str,
+        kind: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Полнотекстовый поиск по вопросам, отчётам и сообщениям диалогов, по релевантности.
+        Совпадения в snippet обрамлены \x02 и \x03, а не разметкой: текст
+        пользовательский, и HTML из него собирает клиент после экранирования.
+        """
+        match = _fts_query(text)
+        if not match:
+            return []
+        query = """
+            SELECT kind, ref_id, parent_id, username, message,
+                snippet(search_index, 1, char(2), char(3), '…', 16), rank
+            FROM search_index
+            WHERE search_index MATCH ?
+        """
+        params: List[Any] = [match]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY rank LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        async with self._read() as db:
+            cursor = await db.execute(query, params)
             rows = await cursor.fetchall()
             return [
                 {
-                    "id": row[0],
-                    "user_id": row[1],
-                    "username": row[2],
-                    "message": row[3],
-                    "file_id": row[4],
-                    "created_at": row[5],
+                    "kind": r[0],
+                    "id": r[1],
+                    "dialog_id": r[2],
+                    "username": r[3],
+                    "message": r[4],
+                    "snippet": r[5],
+                    "rank": r[6],
                 }
-                for row in rows
+                for r in rows
             ]
-        finally:
-            await db.close()
 
     async def list_all_user_ids(self) -> List[int]:
-        db = await self.connect()
-        try:
-            cursor = await db.execute(
-                """
-                SELECT DISTINCT user_id FROM (
-                    SELECT user_id FROM submissions
-                    UNION ALL
-                    SELECT user_id FROM actions
-                    UNION ALL
-                    SELECT user_id FROM questions
-                    UNION ALL
-                    SELECT user_id FROM reports
-                )
-                WHERE user_id IS NOT NULL
-                """
-            )
+        async with self._read() as db:
+            cursor = await db.execute("SELECT user_id FROM users ORDER BY user_id")
             rows = await cursor.fetchall()
-            return [row[0] for row in rows if row[0] is not None]
-        finally:
-            await db.close()
+            return [row[0] for row in rows]
 
-    async def count_users_all(self) -> int:
-        db = await self.connect()
-        try:
-            cursor = await db.execute(
-                """
-                SELECT COUNT(DISTINCT user_id) FROM (
-                    SELECT user_id, created_at FROM submissions
-                    UNION ALL
-                    SELECT user_id, created_at FROM actions
-                    UNION ALL
-                    SELECT user_id, created_at FROM questions
-                    UNION ALL
-                    SELECT user_id, created_at FROM reports
+    async def changes_token(self) -> int:
+        """Номер последнего изменения в журнале changes: курсор для /changes."""
+        async with self._read() as db:
+            # голый MAX(seq) берётся из конца индекса, без обхода журнала
+            cursor = await db.execute("SELECT MAX(seq) FROM changes")
+            row = await cursor.fetchone()
+            return row[0] or 0
+
+    async def changes_version(self, entity: str) -> int:
+        """Номер последнего изменения одного списка: из него строится ETag ответа."""
+        async with self._read() as db:
+            cursor = await db.execute("SELECT MAX(seq) FROM changes WHERE entity = ?", (entity,))
+            row = await cursor.fetchone()
+            return row[0] or 0
+
+    async def get_changes(
+        self,
+        since: int,
+        limit: int = 1000,
+        entities: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Изменения списков админки после курсора since: текущие строки добавленных
+        и изменённых записей (changed) и id удалённых (deleted). Читается только
+        журнал после курсора и сами изменённые строки по первичному ключу, так что
+        цена зависит от числа изменений, а не от размера таблиц.
+        entities — только эти списки: журнал остальных (прежде всего actions) не читается.
+        reset=True — курсор старше журнала или не из этой базы: нужна полная перезагрузка.
+        """
+        async with self._read() as db:
+            # MIN и MAX отдельными подзапросами: вместе в одном SELECT SQLite обходит всю таблицу
+            cursor = await db.execute("SELECT (SELECT MIN(seq) FROM changes), (SELECT MAX(seq) FROM changes)")
+            first, last = await cursor.fetchone()
+            last = last or 0
+            if since > last or (first is not None and since < first - 1):
+                return {"token": last, "reset": True, "has_more": False, "changed": {}, "deleted": {}}
+            if entities is None:
+                cursor = await db.execute(
+                    "SELECT seq, entity, row_id, op FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (since, limit),
                 )
-                WHERE user_id IS NOT NULL
-                """
-            )
+                log = await cursor.fetchall()
+            else:
+                # по запросу на список через idx_changes_entity (entity, seq), затем слияние по seq
+                log = []
+                for entity in entities:
+                    cursor = await db.execute(
+                        "SELECT seq, entity, row_id, op FROM changes WHERE entity = ? AND seq > ? ORDER BY seq LIMIT ?",
+                        (entity, since, limit),
+                    )
+                    log.extend(await cursor.fetchall())
+                log.sort()
+                del log[limit:]
+            has_more = len(log) >= limit
+            # несколько изменений одной записи схлопываются в последнее
+            latest: Dict[Tuple[str, int], str] = {}
+            for _, entity, row_id, op in log:
+                latest[(entity, row_id)] = op
+            upserts: Dict[str, List[int]] = {}
+            deleted: Dict[str, List[int]] = {}
+            for (entity, row_id), op in latest.items():
+                (deleted if op == "delete" else upserts).setdefault(entity, []).append(row_id)
+            changed: Dict[str, List[Dict[str, Any]]] = {}
+            for entity, ids in upserts.items():
+                columns = CHANGE_COLUMNS[entity]
+                rows: List[Dict[str, Any]] = []
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    cursor = await db.execute(
+                        f"SELECT {', '.join(columns)} FROM {entity} "
+                        f"WHERE id IN ({', '.join('?' * len(chunk))}) ORDER BY id",
+                        chunk,
+                    )
+                    rows.extend(dict(zip(columns, row)) for row in await cursor.fetchall())
+                if entity == "actions":
+                    for row in rows:
+                        row["details"] = json.loads(row["details"] or "{}")
+                # строки, удалённые после этой страницы журнала, придут в deleted следующей
+                changed[entity] = rows
+        # журнал прочитан до конца — курсор сдвигается до last, даже если отобранных
+        # изменений не было: иначе при одних actions он отстал бы и попал под обрезку
+        return {
+            "token": log[-1][0] if has_more else max(last, log[-1][0] if log else since),
+            "reset": False,
+            "has_more": has_more,
+            "changed": changed,
+            "deleted": deleted,
+        }
+
+    async def count_users_all(self) -> int:
+        async with self._read() as db:
+            cursor = await db.execute("SELECT COUNT(*) FROM users")
             row = await cursor.fetchone()
             return row[0] if row and row[0] is not None else 0
-        finally:
-            await db.close()
 
     async def count_users_last_week(self) -> int:
-        db = await self.connect()
-        try:
+        async with self._read() as db:
             cursor = await db.execute(
-                """
-                SELECT COUNT(DISTINCT user_id) FROM (
-                    SELECT user_id, created_at FROM submissions
-                    UNION ALL
-                    SELECT user_id, created_at FROM actions
-                    UNION ALL
-                    SELECT user_id, created_at FROM questions
-                    UNION ALL
-                    SELECT user_id, created_at FROM reports
-                )
-                WHERE user_id IS NOT NULL
-                  AND created_at >= datetime('now', '-7 day')
-                """
+                "SELECT COUNT(*) FROM users WHERE last_seen >= datetime('now', '-7 day')"
             )
             row = await cursor.fetchone()
             return row[0] if row and row[0] is not None else 0
-        finally:
-            await db.close()
 
     async def get_or_create_dialog(self, user_id: int, username: Optional[str]) -> int:
-        db = await self.connect()
-        try:
+        async with self._write() as db:
             cursor = await db.execute(
-                "SELECT id FROM dialogs WHERE user_id = ? AND status = 'open' ORDER BY updated_at DESC LIMIT 1",
+                "SELECT id FROM dialogs WHERE user_id = ? AND status = 'open' ORDER BY updated_at DESC, id DESC LIMIT 1",
                 (user_id,),
             )
             row = await cursor.fetchone()
@@ -425,40 +817,81 @@ class Database:
                     (user_id, username),
                 )
                 dialog_id = cur.lastrowid
-                await db.commit()
             return dialog_id
-        finally:
-            await db.close()
 
     async def add_dialog_message(self, dialog_id: int, direction: str, message: str = "", file_id: Optional[str] = None) -> int:
-        db = await self.connect()
-        try:
+        async with self._write() as db:
             cur = await db.execute(
                 "INSERT INTO dialog_messages (dialog_id, direction, message, file_id) VALUES (?, ?, ?, ?)",
                 (dialog_id, direction, message, file_id),
             )
-            await db.execute("UPDATE dialogs SET updated_at = CURRENT_TIMESTAMP WHERE id = ?", (dialog_id,))
-            await db.commit()
+            # счётчики диалога обновляются в той же транзакции, что и вставка сообщения;
+            # ответ админа обнуляет непрочитанные
+            await db.execute(
+                """
+                UPDATE dialogs SET
+                    updated_at = CURRENT_TIMESTAMP,
+                    last_message = ?,
+                    last_message_at = CURRENT_TIMESTAMP,
+                    message_count = message_count + 1,
+                    unread_admin = CASE WHEN ? = 'admin' THEN 0 ELSE unread_admin + 1 END
+                WHERE id = ?
+                """,
+                (message, direction, dialog_id),
+            )
             return cur.lastrowid
-        finally:
-            await db.close()
 
-    async def list_dialogs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
-        db = await self.connect()
-        try:
-            query = """
-                SELECT d.id, d.user_id, d.username, d.status, d.created_at, d.updated_at,
-                    (SELECT message FROM dialog_messages dm WHERE dm.dialog_id = d.id ORDER BY dm.created_at DESC LIMIT 1) as last_message
-                FROM dialogs d
-            """
-            params: List[Any] = []
-            if status:
-                query += " WHERE d.status = ?"
-                params.append(status)
-            query += " ORDER BY d.updated_at DESC LIMIT ?"
-            params.append(limit)
+    async def mark_dialog_read(self, dialog_id: int) -> None:
+        async with self._write() as db:
+            await db.execute(
+                "UPDATE dialogs SET unread_admin = 0 WHERE id = ? AND unread_admin > 0",
+                (dialog_id,),
+            )
+
+    async def list_dialogs(
+        self,
+        status: Optional[str] = None,
+        limit: int = 50,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Диалоги по убыванию updated_at. Курсор — id диалога: страница строится
+        сравнением пары (updated_at, id) с позицией курсора, т.е. поиском по индексу.
+        """
+        conditions: List[str] = []
+        params: List[Any] = []
+        if status:
+            conditions.append("d.status = ?")
+            params.append(status)
+        if user_id is not None:
+            # idx_dialogs_user_updated (m0012)
+            conditions.append("d.user_id = ?")
+            params.append(user_id)
+        cursor_position = "(SELECT updated_at, id FROM dialogs WHERE id = ?)"
+        if before_id is not None:
+            conditions.append(f"(d.updated_at, d.id) < {cursor_position}")
+            params.append(before_id)
+        if after_id is not None:
+            conditions.append(f"(d.updated_at, d.id) > {cursor_position}")
+            params.append(after_id)
+        ascending = after_id is not None and before_id is None
+        order = "ASC" if ascending else "DESC"
+        query = """
+            SELECT d.id, d.user_id, d.username, d.status, d.created_at, d.updated_at,
+                d.last_message, d.last_message_at, d.message_count, d.unread_admin
+            FROM dialogs d
+        """
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY d.updated_at {order}, d.id {order} LIMIT ?"
+        params.append(limit)
+        async with self._read() as db:
             cursor = await db.execute(query, params)
             rows = await cursor.fetchall()
+            if ascending:
+                rows.reverse()
             return [
                 {
                     "id": r[0],
@@ -468,31 +901,27 @@ class Database:
                     "created_at": r[4],
                     "updated_at": r[5],
                     "last_message": r[6],
+                    "last_message_at": r[7],
+                    "message_count": r[8],
+                    "unread_admin": r[9],
                 }
                 for r in rows
             ]
-        finally:
-            await db.close()
 
-    async def get_dialog(self, dialog_id: int) -> Optional[Dict[str, Any]]:
-        db = await self.connect()
-        try:
+    async def get_dialog_header(self, dialog_id: int) -> Optional[Dict[str, Any]]:
+        """Карточка диалога без сообщений: дешёвая проверка существования и статуса."""
+        async with self._read() as db:
             cur = await db.execute(
-                "SELECT id, user_id, username, status, created_at, updated_at FROM dialogs WHERE id = ?",
+                """
+                SELECT id, user_id, username, status, created_at, updated_at,
+                    last_message, last_message_at, message_count, unread_admin
+                FROM dialogs WHERE id = ?
+                """,
                 (dialog_id,),
             )
             d = await cur.fetchone()
             if not d:
                 return None
-            cur = await db.execute(
-                "SELECT id, direction, message, file_id, created_at FROM dialog_messages WHERE dialog_id = ? ORDER BY created_at ASC",
-                (dialog_id,),
-            )
-            msgs_rows = await cur.fetchall()
-            messages = [
-                {"id": m[0], "direction": m[1], "message": m[2], "file_id": m[3], "created_at": m[4]}
-                for m in msgs_rows
-            ]
             return {
                 "id": d[0],
                 "user_id": d[1],
@@ -500,23 +929,230 @@ class Database:
                 "status": d[3],
                 "created_at": d[4],
                 "updated_at": d[5],
-                "messages": messages,
+                "last_message": d[6],
+                "last_message_at": d[7],
+                "message_count": d[8],
+                "unread_admin": d[9],
             }
-        finally:
-            await db.close()
+
+    async def list_dialog_messages(
+        self,
+        dialog_id: int,
+        before_message_id: Optional[int] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """
+        Последние limit сообщений диалога старше before_message_id
+        (или самые свежие, если курсор не задан) в хронологическом порядке.
+        """
+        query = "SELECT id, direction, message, file_id, created_at FROM dialog_messages WHERE dialog_id = ?"
+        params: List[Any] = [dialog_id]
+        if before_message_id is not None:
+            query += " AND id < ?"
+            params.append(before_message_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        async with self._read() as db:
+            cur = await db.execute(query, params)
+            rows = await cur.fetchall()
+        rows.reverse()
+        return [
+            {"id": m[0], "direction": m[1], "message": m[2], "file_id": m[3], "created_at": m[4]}
+            for m in rows
+        ]
+
+    async def get_dialog_message(self, message_id: int) -> Optional[Dict[str, Any]]:
+        async with self._read() as db:
+            cur = await db.execute(
+                "SELECT id, dialog_id, direction, message, file_id, created_at FROM dialog_messages WHERE id = ?",
+                (message_id,),
+            )
+            m = await cur.fetchone()
+        if not m:
+            return None
+        return {"id": m[0], "dialog_id": m[1], "direction": m[2], "message": m[3], "file_id": m[4], "created_at": m[5]}
+
+    async def get_dialog(self, dialog_id: int, limit: int = 50) -> Optional[Dict[str, Any]]:
+        """Карточка диалога вместе с хвостом истории из limit последних сообщений."""
+        dialog = await self.get_dialog_header(dialog_id)
+        if not dialog:
+            return None
+        dialog["messages"] = await self.list_dialog_messages(dialog_id, limit=limit)
+        return dialog
 
     async def set_dialog_status(self, dialog_id: int, status: str) -> None:
-        db = await self.connect()
-        try:
+        async with self._write() as db:
             await db.execute("UPDATE dialogs SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (status, dialog_id))
-            await db.commit()
-        finally:
-            await db.close()
 
     async def delete_dialog(self, dialog_id: int) -> None:
-        db = await self.connect()
-        try:
+        async with self._write() as db:
             await db.execute("DELETE FROM dialogs WHERE id = ?", (dialog_id,))
-            await db.commit()
-        finally:
-            await db.close()
+
+    async def get_fsm_record(self, key: str) -> Optional[Tuple[Optional[str], str, int]]:
+        async with self._read() as db:
+            cursor = await db.execute(
+                "SELECT state, data, updated_at FROM fsm_states WHERE key = ?",
+                (key,),
+            )
+            row = await cursor.fetchone()
+            return (row[0], row[1], row[2]) if row else None
+
+    async def save_fsm_records(self, rows: Sequence[Tuple[str, Optional[str], Optional[str], int]]) -> None:
+        """
+        Пачка изменений FSM одной транзакцией.
+        rows: (key, state, data_json, updated_at); data_json=None — запись удаляется.
+        """
+        upserts = [row for row in rows if row[2] is not None]
+        deletes = [(row[0],) for row in rows if row[2] is None]
+        async with self._write() as db:
+            if upserts:
+                await db.executemany(
+                    """
+                    INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        state = excluded.state,
+                        data = excluded.data,
+                        updated_at = excluded.updated_at
+                    """,
+                    upserts,
+                )
+            if deletes:
+                await db.executemany("DELETE FROM fsm_states WHERE key = ?", deletes)
+
+    async def delete_expired_fsm(self, older_than: int) -> int:
+        async with self._write() as db:
+            cursor = await db.execute("DELETE FROM fsm_states WHERE updated_at < ?", (older_than,))
+            return cursor.rowcount
+
+    async def create_broadcast(
+        self,
+        message: str,
+        owner: Optional[str] = None,
+        lease_seconds: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Создаёт рассылку и список получателей (все пользователи) одной транзакцией.
+        owner — процесс, который сразу её шлёт: аренда на lease_seconds (см. claim_broadcast).
+        """
+        async with self._write() as db:
+            cursor = await db.execute(
+                f"INSERT INTO broadcasts (message, owner, lease_until) VALUES (?, ?, {UNIX_NOW} + ?)",
+                (message, owner, lease_seconds),
+            )
+            broadcast_id = cursor.lastrowid
+            cursor = await db.execute(
+                # user_id = 0 пишется, когда у сообщения нет отправителя: доставить туда нечего
+                "INSERT INTO broadcast_recipients (broadcast_id, user_id) SELECT ?, user_id FROM users WHERE user_id > 0",
+                (broadcast_id,),
+            )
+            total = cursor.rowcount
+            await db.execute("UPDATE broadcasts SET total = ? WHERE id = ?", (total, broadcast_id))
+            return {"id": broadcast_id, "total": total}
+
+    async def get_broadcast(self, broadcast_id: int) -> Optional[Dict[str, Any]]:
+        async with self._read() as db:
+            cursor = await db.execute(
+                """
+                SELECT id, message, status, total, sent, failed, created_at, finished_at
+                FROM broadcasts WHERE id = ?
+                """,
+                (broadcast_id,),
+            )
+            row = await cursor.fetchone()
+            if not row:
+                return None
+            return {
+                "id": row[0],
+                "message": row[1],
+                "status": row[2],
+                "total": row[3],
+                "sent": row[4],
+                "failed": row[5],
+                "created_at": row[6],
+                "finished_at": row[7],
+            }
+
+    async def list_running_broadcasts(self) -> List[int]:
+        async with self._read() as db:
+            cursor = await db.execute("SELECT id FROM broadcasts WHERE status = 'running' ORDER BY id")
+            rows = await cursor.fetchall()
+            return [row[0] for row in rows]
+
+    async def claim_broadcast(self, broadcast_id: int, owner: str, lease_seconds: int) -> bool:
+        """
+        Берёт или продлевает аренду незавершённой рассылки. Удаётся, если рассылка
+        свободна, её аренда истекла или уже принадлежит owner; иначе False — её шлёт
+        другой процесс. Проверка и запись — один UPDATE, две реплики не получат
+        одну рассылку.
+        """
+        async with self._write() as db:
+            cursor = await db.execute(
+                f"""
+                UPDATE broadcasts SET owner = ?1, lease_until = {UNIX_NOW} + ?2
+                WHERE id = ?3 AND status = 'running'
+                  AND (owner IS NULL OR owner = ?1 OR lease_until IS NULL OR lease_until < {UNIX_NOW})
+                """,
+                (owner, lease_seconds, broadcast_id),
+            )
+            return cursor.rowcount > 0
+
+    async def release_broadcast(self, broadcast_id: int, owner: str) -> None:
+        """Снимает аренду owner, чтобы рассылку сразу подхватил другой процесс."""
+        async with self._write() as db:
+            await db.execute(
+                "UPDATE broadcasts SET owner = NULL, lease_until = NULL WHERE id = ? AND owner = ?",
+                (broadcast_id, owner),
+            )
+
+    async def next_broadcast_recipients(self, broadcast_id: int, after_user_id: int, limit: int) -> List[int]:
+        async with self._read() as db:
+            cursor = await db.execute(
+                """
+                SELECT user_id FROM broadcast_recipients
+                WHERE broadcast_id = ? AND status = 'pending' AND user_id > ?
+                ORDER BY user_id LIMIT ?
+                """,
+                (broadcast_id, after_user_id, limit),
+            )
+            rows = await cursor.fetchall()
+            return [row[0] for row in rows]
+
+    async def record_broadcast_results(
+        self,
+        broadcast_id: int,
+        results: Sequence[Tuple[int, str, Optional[str]]],
+    ) -> None:
+        """Пачка итогов (user_id, status, error) и счётчики рассылки в одной транзакции."""
+        counts = {"sent": 0, "failed": 0}
+        async with self._write() as db:
+            for status in counts:
+                rows = [(status, error, broadcast_id, user_id) for user_id, st, error in results if st == status]
+                if not rows:
+                    continue
+                # считаем только реально обновлённые строки, повторный итог счётчик не двигает
+                cursor = await db.executemany(
+                    """
+                    UPDATE broadcast_recipients SET status = ?, error = ?
+                    WHERE broadcast_id = ? AND user_id = ? AND status = 'pending'
+                    """,
+                    rows,
+                )
+                counts[status] = cursor.rowcount
+            await db.execute(
+                "UPDATE broadcasts SET sent = sent + ?, failed = failed + ? WHERE id = ?",
+                (counts["sent"], counts["failed"], broadcast_id),
+            )
+
+    async def finish_broadcast(self, broadcast_id: int) -> bool:
+        """Помечает рассылку done, если не осталось получателей в pending; иначе False."""
+        async with self._write() as db:
+            cursor = await db.execute(
+                """
+                UPDATE broadcasts SET status = 'done', finished_at = CURRENT_TIMESTAMP, owner = NULL, lease_until = NULL
+                WHERE id = ?1 AND NOT EXISTS (
+                    SELECT 1 FROM broadcast_recipients WHERE broadcast_id = ?1 AND status = 'pending'
+                )
+                """,
+                (broadcast_id,),
+            )
+            return cursor.rowcount > 0
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+from .db import Database
+
+
+@dataclass
+class Event:
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+
+    def encode(self) -> str:
+        """Кадр text/event-stream."""
+        data = json.dumps(self.payload, ensure_ascii=False, default=str)
+        return f"id: {self.id}\nevent: {self.kind}\ndata: {data}\n\n"
+
+
+class EventBus:
+    """
+    Шина изменений внутри процесса: хендлеры бота и API публикуют новые вопросы,
+    отчёты, заявки и сообщения диалогов, админка получает их через /events (SSE).
+
+    Публикация не ждёт подписчиков: у каждого своя ограниченная очередь. Кто не
+    успевает её разбирать, получает событие reset и перечитывает списки целиком.
+    Шина своя у каждого процесса: при нескольких репликах панель видит изменения
+    той реплики, к которой подключена.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers: Set["asyncio.Queue[Optional[Event]]"] = set()
+        self._last_id = 0
+
+    def _event(self, kind: str, payload: Dict[str, Any]) -> Event:
+        self._last_id += 1
+        return Event(self._last_id, kind, payload)
+
+    def publish(self, kind: str, payload: Dict[str, Any]) -> None:
+        if not self._subscribers:
+            return
+        event = self._event(kind, payload)
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # дельты потеряны: очищаем очередь и просим клиента перечитать всё
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._event("reset", {}))
+
+    async def publish_row(self, kind: str, load: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> None:
+        """Публикует запись, прочитанную после коммита; без подписчиков база не читается."""
+        if not self._subscribers:
+            return
+        row = await load()
+        if row:
+            self.publish(kind, row)
+
+    async def publish_dialog_message(self, database: Database, message_id: int) -> None:
+        """Новое сообщение вместе с обновлённой карточкой диалога для списка."""
+        if not self._subscribers:
+            return
+        message = await database.get_dialog_message(message_id)
+        if not message:
+            return
+        dialog = await database.get_dialog_header(message["dialog_id"])
+        if dialog:
+            self.publish("dialog_message", {"dialog": dialog, "message": message})
+
+    def close(self) -> None:
+        """Завершает все подписки: потоки /events заканчиваются, сервер может остановиться."""
+        for queue in self._subscribers:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator["asyncio.Queue[Optional[Event]]"]:
+        """Очередь событий подписчика; None в очереди — шина закрыта."""
+        queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
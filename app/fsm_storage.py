@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from .db import Database
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Record:
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    updated_at: float = 0.0
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM-хранилище в таблице fsm_states с LRU-кэшем горячих чатов в памяти.
+    Чтения обслуживаются из кэша, изменения сразу видны в памяти и пишутся на диск
+    фоновой задачей пачками. Состояния, не менявшиеся дольше ttl секунд, считаются
+    брошенными: они не возвращаются и периодически удаляются из базы.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        cache_size: int = 1000,
+        ttl: float = 7 * 24 * 3600,
+        flush_interval: float = 0.5,
+        purge_interval: float = 3600,
+    ):
+        self.database = database
+        self.cache_size = max(1, cache_size)
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.purge_interval = purge_interval
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        # изменения, ещё не записанные на диск; из кэша они могут быть уже вытеснены
+        self._pending: Dict[str, _Record] = {}
+        # пачка, которая пишется прямо сейчас
+        self._inflight: Dict[str, _Record] = {}
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Дописывает несохранённые изменения и останавливает фоновую задачу."""
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self._flush()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._lookup(key)
+        value = state.state if isinstance(state, State) else state
+        self._store(key, _Record(value, record.data, time.time()))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._lookup(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._lookup(key)
+        self._store(key, _Record(record.state, data.copy(), time.time()))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._lookup(key)).data.copy()
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or 0}:{key.destiny}"
+
+    def _find(self, raw_key: str) -> Optional[_Record]:
+        record = self._cache.get(raw_key)
+        if record is not None:
+            self._cache.move_to_end(raw_key)
+            return record
+        record = self._pending.get(raw_key) or self._inflight.get(raw_key)
+        if record is not None:
+            self._remember(raw_key, record)
+        return record
+
+    async def _lookup(self, key: StorageKey) -> _Record:
+        raw_key = self._key(key)
+        record = self._find(raw_key)
+        if record is None:
+            row = await self.database.get_fsm_record(raw_key)
+            # пока шло чтение, запись могли изменить
+            record = self._find(raw_key)
+            if record is None:
+                record = _Record(row[0], json.loads(row[1]), row[2]) if row else _Record()
+                self._remember(raw_key, record)
+        if record.updated_at and record.updated_at < time.time() - self.ttl:
+            return _Record()
+        return record
+
+    def _remember(self, raw_key: str, record: _Record) -> None:
+        self._cache[raw_key] = record
+        self._cache.move_to_end(raw_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _store(self, key: StorageKey, record: _Record) -> None:
+        raw_key = self._key(key)
+        self._remember(raw_key, record)
+        self._pending[raw_key] = record
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_purge = loop.time()
+        while not self._closing:
+            timeout = max(0.0, next_purge - loop.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            if self._wakeup.is_set() and not self._closing:
+                # копим изменения, чтобы записать их одной транзакцией
+                await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            await self._flush()
+            if loop.time() >= next_purge:
+                await self._purge()
+                next_purge = loop.time() + self.purge_interval
+
+    async def _flush(self) -> None:
+        if not self._pending:
+            return
+        self._inflight, self._pending = self._pending, {}
+        rows = [
+            (raw_key, record.state, None if record.empty else json.dumps(record.data), int(record.updated_at))
+            for raw_key, record in self._inflight.items()
+        ]
+        try:
+            await self.database.save_fsm_records(rows)
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to write %d FSM records", len(rows))
+            # вернём в очередь то, что не успели перезаписать новыми изменениями
+            for raw_key, record in self._inflight.items():
+                self._pending.setdefault(raw_key, record)
+        finally:
+            self._inflight = {}
+
+    async def _purge(self) -> None:
+        try:
+            removed = await self.database.delete_expired_fsm(int(time.time() - self.ttl))
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to purge expired FSM records")
+            return
+        if removed:
+            logger.info("Purged %d expired FSM records", removed)
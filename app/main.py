@@ -1,47 +1,138 @@
 import asyncio
+from typing import Optional
 
 import uvicorn
-from aiogram import Bot
+from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 
+from .action_log import ActionLog
 from .api import create_api
+from .broadcast import BroadcastEngine
 from .bot import setup_bot
 from .config import Settings
 from .db import Database
+from .events import EventBus
+from .fsm_storage import SQLiteStorage
 
 
-async def run_bot(bot: Bot, settings: Settings, database: Database) -> None:
-    dispatcher = setup_bot(settings, database)
-    await dispatcher.start_polling(bot)
+def create_bot(settings: Settings) -> Bot:
+    """
+    Единственный Bot процесса: им пользуются и диспетчер, и админка,
+    поэтому ответы из обоих путей идут через один пул прогретых TLS-соединений.
+    """
+    session = AiohttpSession(timeout=settings.telegram_timeout)
+    # AiohttpSession передаёт эти параметры в TCPConnector при создании сессии
+    session._connector_init.update(
+        limit=settings.telegram_pool_size,
+        keepalive_timeout=settings.telegram_keepalive,
+        ttl_dns_cache=settings.telegram_dns_ttl,
+    )
+    return Bot(
+        token=settings.bot_token,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+
+
+async def run_bot(bot: Bot, dispatcher: Dispatcher) -> None:
+    # вебхук, оставшийся от прошлого запуска, блокирует getUpdates
+    await bot.delete_webhook()
+    # сессию закрывает main(): она общая с HTTP API
+    await dispatcher.start_polling(bot, close_bot_session=False)
+
+
+async def setup_webhook(bot: Bot, dispatcher: Dispatcher, settings: Settings) -> None:
+    await bot.set_webhook(
+        url=settings.webhook_url.rstrip("/") + settings.webhook_path,
+        secret_token=settings.webhook_secret,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+    )
+
 
+class _ApiServer(uvicorn.Server):
+    """
+    uvicorn.Server, который в начале остановки закрывает подписки /events:
+    иначе он ждёт, пока открытые вкладки админки сами отключатся.
+    """
 
-async def run_api(settings: Settings, database: Database) -> None:
-    app = create_api(settings, database)
+    def __init__(self, config: uvicorn.Config, events: EventBus):
+        super().__init__(config)
+        self.events = events
+
+    async def shutdown(self, sockets=None) -> None:
+        self.events.close()
+        await super().shutdown(sockets)
+
+
+async def run_api(
+    settings: Settings,
+    database: Database,
+    bot: Bot,
+    broadcasts: BroadcastEngine,
+    events: EventBus,
+    dispatcher: Optional[Dispatcher] = None,
+) -> None:
+    app = create_api(settings, database, bot, broadcasts, events, dispatcher)
     config = uvicorn.Config(
         app=app,
         host=settings.api_host,
         port=settings.api_port,
         log_level="info",
     )
-    server = uvicorn.Server(config)
+    server = _ApiServer(config, events)
     await server.serve()
 
 
 async def main() -> None:
     settings = Settings.load()
-    database = Database(settings.database_path)
+    database = Database(settings.database_path, readers=settings.database_readers)
     await database.init_db()
-
-    bot = Bot(
-        token=settings.bot_token,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    action_log = ActionLog(
+        database,
+        max_batch=settings.action_batch_size,
+        flush_interval=settings.action_flush_ms / 1000,
+        max_queue=settings.action_queue_size,
+    )
+    await action_log.start()
+    storage = SQLiteStorage(
+        database,
+        cache_size=settings.fsm_cache_size,
+        ttl=settings.fsm_ttl_hours * 3600,
     )
+    await storage.start()
 
-    await asyncio.gather(
-        run_bot(bot, settings, database),
-        run_api(settings, database),
+    bot = create_bot(settings)
+    broadcasts = BroadcastEngine(
+        database,
+        bot,
+        action_log,
+        workers=settings.broadcast_workers,
+        rate=settings.broadcast_rate,
     )
+    await broadcasts.start()
+
+    events = EventBus()
+    dispatcher = setup_bot(settings, database, action_log, storage, events)
+
+    try:
+        if settings.bot_mode == "webhook":
+            # обновления принимает HTTP-сервер; реплик за балансировщиком может быть несколько
+            await setup_webhook(bot, dispatcher, settings)
+            await run_api(settings, database, bot, broadcasts, events, dispatcher)
+        else:
+            await asyncio.gather(
+                run_bot(bot, dispatcher),
+                run_api(settings, database, bot, broadcasts, events),
+            )
+    finally:
+        # сначала останавливаем рассылки и дописываем буфер событий, потом закрываем соединения
+        await broadcasts.close()
+        await action_log.close()
+        await storage.close()
+        await database.close()
+        await bot.session.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+import asyncio
+import mimetypes
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from aiogram import Bot
+
+CHUNK_SIZE = 64 * 1024
+# range-spec из RFC 9110: first-pos "-" [last-pos] или "-" suffix-length
+RANGE_SPEC = re.compile(r"(\d*)-(\d*)", re.ASCII)
+
+# сигнатуры начала файла -> MIME; Telegram отдаёт пути без надёжных расширений
+_SIGNATURES: Tuple[Tuple[int, bytes, str], ...] = (
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (4, b"ftyp", "video/mp4"),
+)
+
+
+def sniff_mime(head: bytes, file_path: str = "") -> str:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for offset, magic, mime in _SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return mime
+    guessed, _ = mimetypes.guess_type(file_path)
+    return guessed or "application/octet-stream"
+
+
+@dataclass
+class CachedFile:
+    path: Path
+    size: int
+    mime: str
+    etag: str
+
+
+@dataclass
+class _FileRef:
+    unique_id: str
+    file_path: str
+    expires_at: float
+
+
+class MediaCache:
+    """
+    Дисковый кэш вложений Telegram, адресуемый по file_unique_id: одно и то же
+    содержимое хранится один раз, как бы ни менялся file_id. Размер каталога
+    ограничен max_bytes, при переполнении удаляются давно не открывавшиеся файлы.
+    Метаданные getFile (file_id -> file_unique_id, file_path) кэшируются в памяти:
+    file_path живёт у Telegram ограниченное время, поэтому с TTL.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        directory: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        path_ttl: float = 3600,
+        max_refs: int = 10000,
+    ):
+        self.bot = bot
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.path_ttl = path_ttl
+        self.max_refs = max_refs
+        self._refs: "OrderedDict[str, _FileRef]" = OrderedDict()
+        self._files: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self._total = 0
+        self._downloads: Dict[str, asyncio.Future] = {}
+        self._load()
+
+    def _load(self) -> None:
+        # восстанавливаем LRU по времени последнего обращения к файлам
+        entries = []
+        for path in self.directory.iterdir():
+            if path.suffix == ".part":
+                path.unlink(missing_ok=True)
+                continue
+            if path.is_file():
+                stat = path.stat()
+                entries.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._remember(path.name, path, size)
+
+    def _remember(self, unique_id: str, path: Path, size: int) -> CachedFile:
+        with path.open("rb") as f:
+            head = f.read(16)
+        cached = CachedFile(path=path, size=size, mime=sniff_mime(head), etag=f'"{unique_id}"')
+        self._files[unique_id] = cached
+        self._total += size
+        return cached
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and len(self._files) > 1:
+            _, cached = self._files.popitem(last=False)
+            self._total -= cached.size
+            cached.path.unlink(missing_ok=True)
+
+    async def _resolve(self, file_id: str) -> _FileRef:
+        ref = self._refs.get(file_id)
+        if ref is not None and ref.expires_at > time.monotonic():
+            self._refs.move_to_end(file_id)
+            return ref
+        file = await self.bot.get_file(file_id)
+        ref = _FileRef(file.file_unique_id, file.file_path or "", time.monotonic() + self.path_ttl)
+        self._refs[file_id] = ref
+        while len(self._refs) > self.max_refs:
+            self._refs.popitem(last=False)
+        return ref
+
+    async def get(self, file_id: str) -> CachedFile:
+        """Файл из кэша; при промахе скачивается один раз, даже при параллельных запросах."""
+        ref = self._refs.get(file_id)
+        if ref is not None and ref.unique_id in self._files:
+            # содержимое уже на диске: file_path не нужен, TTL не важен
+            self._refs.move_to_end(file_id)
+            return self._touch(ref.unique_id)
+        ref = await self._resolve(file_id)
+        if ref.unique_id in self._files:
+            return self._touch(ref.unique_id)
+        pending = self._downloads.get(ref.unique_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._download(ref))
+            self._downloads[ref.unique_id] = pending
+            pending.add_done_callback(lambda _: self._downloads.pop(ref.unique_id, None))
+        return await asyncio.shield(pending)
+
+    def _touch(self, unique_id: str) -> CachedFile:
+        self._files.move_to_end(unique_id)
+        cached = self._files[unique_id]
+        try:
+            os.utime(cached.path)
+        except OSError:
+            pass
+        return cached
+
+    async def _download(self, ref: _FileRef) -> CachedFile:
+        target = self.directory / ref.unique_id
+        part = target.with_suffix(".part")
+        try:
+            await self.bot.download_file(ref.file_path, destination=part)
+            os.replace(part, target)
+        finally:
+            part.unlink(missing_ok=True)
+        cached = self._remember(ref.unique_id, target, target.stat().st_size)
+        if cached.mime == "application/octet-stream":
+            cached.mime = sniff_mime(b"", ref.file_path)
+        self._evict()
+        return cached
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Разбирает "bytes=start-end" (один диапазон) в (start, end) включительно.
+    None — заголовка нет, он не про байты или записан с ошибкой: такой Range
+    игнорируется и отдаётся весь файл (RFC 9110). ValueError — диапазон записан
+    верно, но невыполним.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        # несколько диапазонов не поддерживаем: отдаём файл целиком
+        return None
+    match = RANGE_SPEC.fullmatch(spec)
+    if match is None:
+        return None
+    start_raw, end_raw = match.groups()
+    if not start_raw:
+        if not end_raw:
+            return None
+        # суффикс: последние N байт
+        length = int(end_raw)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(start_raw)
+    end = int(end_raw) if end_raw else None
+    if end is not None and end < start:
+        # last-pos меньше first-pos — диапазон записан с ошибкой
+        return None
+    if start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+def iter_file(path: Path, start: int, end: int) -> Iterator[bytes]:
+    """Читает [start, end] кусками: в памяти не больше одного куска на ответ."""
+    # открываем сразу: до начала отдачи файл могут вытеснить из кэша
+    f = path.open("rb")
+
+    def chunks() -> Iterator[bytes]:
+        with f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    return chunks()
@@ -0,0 +1,65 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from .action_log import ActionLog
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ActionEvent:
+    """
+    Событие для журнала actions текущего апдейта.
+    Хендлер получает его аргументом action_event: может дополнить details
+    или задать/сбросить action (None — ничего не пишется).
+    """
+
+    action: Optional[str]
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+class ActionLogMiddleware(BaseMiddleware):
+    """
+    Пишет событие в журнал после того, как хендлер отработал и ответил пользователю,
+    и замеряет длительность хендлера (details.duration_ms).
+    Имя события берётся из флага хендлера: @flags.action("start").
+
+    Подключается как inner-middleware: во внешнем ещё неизвестно, какой хендлер
+    выбран, а значит и его флаги.
+    """
+
+    def __init__(self, action_log: ActionLog):
+        self.action_log = action_log
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        # маршрут из RouteTable важнее общего хендлера-диспетчера таблицы
+        target = data.get("route") or data.get("handler")
+        flags = getattr(target, "flags", None) or {}
+        action_event = ActionEvent(flags.get("action"))
+        data["action_event"] = action_event
+
+        started = time.perf_counter()
+        result = await handler(event, data)
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        name = getattr(getattr(target, "callback", None), "__name__", "handler")
+        logger.debug("%s handled in %.1f ms", name, duration_ms)
+        if action_event.action:
+            user = data.get("event_from_user")
+            await self.action_log.add_action(
+                action=action_event.action,
+                user_id=user.id if user else None,
+                username=user.username if user else None,
+                details={**action_event.details, "duration_ms": duration_ms},
+            )
+        return result
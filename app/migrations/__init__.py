@@ -0,0 +1,71 @@
+"""
+Версионные миграции схемы SQLite.
+
+Каждая миграция — модуль `mNNNN_<название>.py` с корутиной `upgrade(db)`.
+Номер уже применённой версии хранится в `PRAGMA user_version`; при старте
+применяются все модули с номером больше текущего, каждый в своей транзакции.
+"""
+import importlib
+import pkgutil
+import sqlite3
+from types import ModuleType
+from typing import List, Tuple
+
+import aiosqlite
+
+
+def _discover() -> List[Tuple[int, ModuleType]]:
+    found: List[Tuple[int, ModuleType]] = []
+    for info in pkgutil.iter_modules(__path__):
+        name = info.name
+        if not name.startswith("m") or "_" not in name:
+            continue
+        version_str = name[1:].split("_", 1)[0]
+        if not version_str.isdigit():
+            continue
+        module = importlib.import_module(f"{__name__}.{name}")
+        found.append((int(version_str), module))
+    found.sort(key=lambda item: item[0])
+    versions = [version for version, _ in found]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return found
+
+
+async def execute_script(db: aiosqlite.Connection, script: str) -> None:
+    """
+    Выполняет несколько SQL-выражений внутри текущей транзакции.
+    В отличие от executescript(), не делает неявный COMMIT перед запуском.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            await db.execute(statement)
+            statement = ""
+    if statement.strip():
+        await db.execute(statement)
+
+
+async def get_version(db: aiosqlite.Connection) -> int:
+    async with db.execute("PRAGMA user_version") as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else 0
+
+
+async def run_migrations(db: aiosqlite.Connection) -> int:
+    """Применяет недостающие миграции и возвращает итоговую версию схемы."""
+    current = await get_version(db)
+    for version, module in _discover():
+        if version <= current:
+            continue
+        await db.execute("BEGIN")
+        try:
+            await module.upgrade(db)
+            await db.execute(f"PRAGMA user_version = {version}")
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        current = version
+    return current
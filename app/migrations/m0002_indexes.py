@@ -0,0 +1,31 @@
+"""Индексы под горячие запросы из db.py."""
+import aiosqlite
+
+from . import execute_script
+
+SCRIPT = """
+    -- подсчёт уникальных пользователей и выборки по пользователю
+    CREATE INDEX IF NOT EXISTS idx_submissions_user ON submissions (user_id, id);
+    CREATE INDEX IF NOT EXISTS idx_actions_user ON actions (user_id, id);
+    CREATE INDEX IF NOT EXISTS idx_questions_user ON questions (user_id, id);
+    CREATE INDEX IF NOT EXISTS idx_reports_user ON reports (user_id, id);
+
+    -- активность за период (count_users_last_week), покрывающие индексы
+    CREATE INDEX IF NOT EXISTS idx_submissions_created ON submissions (created_at, user_id);
+    CREATE INDEX IF NOT EXISTS idx_actions_created ON actions (created_at, user_id);
+    CREATE INDEX IF NOT EXISTS idx_questions_created ON questions (created_at, user_id);
+    CREATE INDEX IF NOT EXISTS idx_reports_created ON reports (created_at, user_id);
+
+    -- открытый диалог пользователя (get_or_create_dialog)
+    CREATE INDEX IF NOT EXISTS idx_dialogs_user_status ON dialogs (user_id, status, updated_at);
+    -- список диалогов с фильтром по статусу и без него (list_dialogs)
+    CREATE INDEX IF NOT EXISTS idx_dialogs_status_updated ON dialogs (status, updated_at);
+    CREATE INDEX IF NOT EXISTS idx_dialogs_updated ON dialogs (updated_at);
+
+    -- сообщения диалога по порядку (get_dialog, последнее сообщение, каскадное удаление)
+    CREATE INDEX IF NOT EXISTS idx_dialog_messages_dialog ON dialog_messages (dialog_id, id);
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    await execute_script(db, SCRIPT)
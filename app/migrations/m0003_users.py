@@ -0,0 +1,50 @@
+"""Таблица users: один ряд на пользователя вместо UNION ALL по журналам событий."""
+import aiosqlite
+
+from . import execute_script
+
+SCRIPT = """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        preferred_age TEXT,
+        first_seen DATETIME DEFAULT CURRENT_TIMESTAMP,
+        last_seen DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_users_last_seen ON users (last_seen);
+
+    -- разовое заполнение из уже накопленных данных
+    INSERT OR IGNORE INTO users (user_id, username, first_seen, last_seen)
+    SELECT user_id, username, first_seen, last_seen FROM (
+        SELECT
+            user_id,
+            username,
+            MIN(created_at) OVER (PARTITION BY user_id) AS first_seen,
+            MAX(created_at) OVER (PARTITION BY user_id) AS last_seen,
+            ROW_NUMBER() OVER (
+                PARTITION BY user_id ORDER BY username IS NULL, created_at DESC
+            ) AS rn
+        FROM (
+            SELECT user_id, username, created_at FROM submissions
+            UNION ALL
+            SELECT user_id, username, created_at FROM actions
+            UNION ALL
+            SELECT user_id, username, created_at FROM questions
+            UNION ALL
+            SELECT user_id, username, created_at FROM reports
+        )
+        WHERE user_id IS NOT NULL
+    )
+    WHERE rn = 1;
+
+    UPDATE users SET preferred_age = (
+        SELECT json_extract(a.details, '$.age') FROM actions a
+        WHERE a.user_id = users.user_id AND a.action = 'age_selected'
+        ORDER BY a.id DESC LIMIT 1
+    );
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    await execute_script(db, SCRIPT)
@@ -0,0 +1,38 @@
+"""Денормализованные поля диалога: последнее сообщение, счётчики сообщений и непрочитанных."""
+import aiosqlite
+
+from . import execute_script
+
+SCRIPT = """
+    ALTER TABLE dialogs ADD COLUMN last_message TEXT;
+    ALTER TABLE dialogs ADD COLUMN last_message_at DATETIME;
+    ALTER TABLE dialogs ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE dialogs ADD COLUMN unread_admin INTEGER NOT NULL DEFAULT 0;
+
+    UPDATE dialogs SET
+        last_message = (
+            SELECT message FROM dialog_messages dm
+            WHERE dm.dialog_id = dialogs.id ORDER BY dm.id DESC LIMIT 1
+        ),
+        last_message_at = (
+            SELECT created_at FROM dialog_messages dm
+            WHERE dm.dialog_id = dialogs.id ORDER BY dm.id DESC LIMIT 1
+        ),
+        message_count = (
+            SELECT COUNT(*) FROM dialog_messages dm WHERE dm.dialog_id = dialogs.id
+        ),
+        -- непрочитанные: сообщения пользователя после последнего ответа админа
+        unread_admin = (
+            SELECT COUNT(*) FROM dialog_messages dm
+            WHERE dm.dialog_id = dialogs.id
+              AND dm.direction = 'user'
+              AND dm.id > COALESCE((
+                  SELECT MAX(a.id) FROM dialog_messages a
+                  WHERE a.dialog_id = dialogs.id AND a.direction = 'admin'
+              ), 0)
+        );
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    await execute_script(db, SCRIPT)
@@ -0,0 +1,77 @@
+"""
+Полнотекстовый поиск (FTS5) по вопросам, отчётам и сообщениям диалогов.
+
+Все документы лежат в одной таблице search_index; rowid кодирует источник
+(id * 4 + вид), поэтому триггеры удаляют записи точечно по rowid.
+"""
+import aiosqlite
+
+from . import execute_script
+
+SCRIPT = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        username,
+        message,
+        kind UNINDEXED,
+        ref_id UNINDEXED,
+        parent_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS questions_search_insert AFTER INSERT ON questions BEGIN
+        INSERT INTO search_index (rowid, username, message, kind, ref_id, parent_id)
+        VALUES (NEW.id * 4 + 1, NEW.username, NEW.message, 'question', NEW.id, NULL);
+    END;
+    CREATE TRIGGER IF NOT EXISTS questions_search_delete AFTER DELETE ON questions BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS questions_search_update AFTER UPDATE OF username, message ON questions BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+        INSERT INTO search_index (rowid, username, message, kind, ref_id, parent_id)
+        VALUES (NEW.id * 4 + 1, NEW.username, NEW.message, 'question', NEW.id, NULL);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS reports_search_insert AFTER INSERT ON reports BEGIN
+        INSERT INTO search_index (rowid, username, message, kind, ref_id, parent_id)
+        VALUES (NEW.id * 4 + 2, NEW.username, NEW.message, 'report', NEW.id, NULL);
+    END;
+    CREATE TRIGGER IF NOT EXISTS reports_search_delete AFTER DELETE ON reports BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+    END;
+    CREATE TRIGGER IF NOT EXISTS reports_search_update AFTER UPDATE OF username, message ON reports BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+        INSERT INTO search_index (rowid, username, message, kind, ref_id, parent_id)
+        VALUES (NEW.id * 4 + 2, NEW.username, NEW.message, 'report', NEW.id, NULL);
+    END;
+
+    -- username сообщения диалога берётся из самого диалога
+    CREATE TRIGGER IF NOT EXISTS dialog_messages_search_insert AFTER INSERT ON dialog_messages BEGIN
+        INSERT INTO search_index (rowid, username, message, kind, ref_id, parent_id)
+        VALUES (
+            NEW.id * 4 + 3,
+            (SELECT username FROM dialogs WHERE id = NEW.dialog_id),
+            NEW.message,
+            'dialog',
+            NEW.id,
+            NEW.dialog_id
+        );
+    END;
+    CREATE TRIGGER IF NOT EXISTS dialog_messages_search_delete AFTER DELETE ON dialog_messages BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 3;
+    END;
+
+    INSERT INTO search_index (rowid, username, message, kind, ref_id, parent_id)
+    SELECT id * 4 + 1, username, message, 'question', id, NULL FROM questions;
+
+    INSERT INTO search_index (rowid, username, message, kind, ref_id, parent_id)
+    SELECT id * 4 + 2, username, message, 'report', id, NULL FROM reports;
+
+    INSERT INTO search_index (rowid, username, message, kind, ref_id, parent_id)
+    SELECT dm.id * 4 + 3, d.username, dm.message, 'dialog', dm.id, dm.dialog_id
+    FROM dialog_messages dm JOIN dialogs d ON d.id = dm.dialog_id;
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    await execute_script(db, SCRIPT)
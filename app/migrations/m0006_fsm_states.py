@@ -0,0 +1,19 @@
+"""Таблица fsm_states: состояние и данные FSM переживают перезапуск бота."""
+import aiosqlite
+
+from . import execute_script
+
+SCRIPT = """
+    CREATE TABLE IF NOT EXISTS fsm_states (
+        key TEXT PRIMARY KEY,
+        state TEXT,
+        data TEXT NOT NULL DEFAULT '{}',
+        updated_at INTEGER NOT NULL -- unix-время, по нему истекает TTL
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_fsm_states_updated ON fsm_states (updated_at);
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    await execute_script(db, SCRIPT)
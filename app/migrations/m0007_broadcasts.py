@@ -0,0 +1,33 @@
+"""Рассылки: задание и статус по каждому получателю, чтобы продолжить после перезапуска."""
+import aiosqlite
+
+from . import execute_script
+
+SCRIPT = """
+    CREATE TABLE IF NOT EXISTS broadcasts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        message TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'running', -- running | done
+        total INTEGER NOT NULL DEFAULT 0,
+        sent INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        finished_at DATETIME
+    );
+
+    CREATE TABLE IF NOT EXISTS broadcast_recipients (
+        broadcast_id INTEGER NOT NULL REFERENCES broadcasts (id) ON DELETE CASCADE,
+        user_id INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending', -- pending | sent | failed
+        error TEXT,
+        PRIMARY KEY (broadcast_id, user_id)
+    ) WITHOUT ROWID;
+
+    -- очередь неотправленных: WHERE broadcast_id = ? AND status = 'pending' AND user_id > ?
+    CREATE INDEX IF NOT EXISTS idx_broadcast_recipients_status
+        ON broadcast_recipients (broadcast_id, status, user_id);
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    await execute_script(db, SCRIPT)
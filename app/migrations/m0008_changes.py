@@ -0,0 +1,48 @@
+"""
+Журнал изменений для /changes: каждая вставка, обновление и удаление в списках
+админки получает порядковый номер seq. Клиент хранит последний seq и забирает
+только то, что изменилось после него. Журнал пишут триггеры, поэтому он
+коммитится вместе с самим изменением.
+"""
+import aiosqlite
+
+from . import execute_script
+
+ENTITIES = ("submissions", "questions", "reports", "dialogs")
+
+SCRIPT = """
+    CREATE TABLE IF NOT EXISTS changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        entity TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL -- upsert | delete
+    );
+
+    -- журнал хранит последние ~100 тыс. изменений; более старый курсор получает reset
+    CREATE TRIGGER IF NOT EXISTS changes_trim AFTER INSERT ON changes WHEN NEW.seq % 1000 = 0 BEGIN
+        DELETE FROM changes WHERE seq <= NEW.seq - 100000;
+    END;
+
+    -- события только добавляются
+    CREATE TRIGGER IF NOT EXISTS actions_changes_insert AFTER INSERT ON actions BEGIN
+        INSERT INTO changes (entity, row_id, op) VALUES ('actions', NEW.id, 'upsert');
+    END;
+"""
+
+ENTITY_TRIGGERS = """
+    CREATE TRIGGER IF NOT EXISTS {entity}_changes_insert AFTER INSERT ON {entity} BEGIN
+        INSERT INTO changes (entity, row_id, op) VALUES ('{entity}', NEW.id, 'upsert');
+    END;
+    CREATE TRIGGER IF NOT EXISTS {entity}_changes_update AFTER UPDATE ON {entity} BEGIN
+        INSERT INTO changes (entity, row_id, op) VALUES ('{entity}', NEW.id, 'upsert');
+    END;
+    CREATE TRIGGER IF NOT EXISTS {entity}_changes_delete AFTER DELETE ON {entity} BEGIN
+        INSERT INTO changes (entity, row_id, op) VALUES ('{entity}', OLD.id, 'delete');
+    END;
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    await execute_script(db, SCRIPT)
+    for entity in ENTITIES:
+        await execute_script(db, ENTITY_TRIGGERS.format(entity=entity))
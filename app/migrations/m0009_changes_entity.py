@@ -0,0 +1,13 @@
+"""Индекс журнала изменений по спискам: версия одного списка для ETag без обхода журнала."""
+import aiosqlite
+
+from . import execute_script
+
+SCRIPT = """
+    -- SELECT MAX(seq) FROM changes WHERE entity = ?
+    CREATE INDEX IF NOT EXISTS idx_changes_entity ON changes (entity, seq);
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    await execute_script(db, SCRIPT)
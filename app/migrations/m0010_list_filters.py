@@ -0,0 +1,27 @@
+"""
+Индексы под фильтры и сортировки списков админки (LIST_SORTS в db.py).
+Порядок списков — (created_at, id), поэтому каждый фильтр-равенство получает
+индекс (<колонка>, created_at): поиск по значению, диапазон дат и порядок
+выдачи берутся из одного индекса без сортировки во временном B-дереве.
+Без фильтра работает idx_<таблица>_created (created_at) из m0011.
+"""
+import aiosqlite
+
+from . import execute_script
+
+SCRIPT = """
+    -- /submissions?bank=&status=&user_id= и sort=bank|status
+    CREATE INDEX IF NOT EXISTS idx_submissions_bank_created ON submissions (bank, created_at);
+    CREATE INDEX IF NOT EXISTS idx_submissions_status_created ON submissions (status, created_at);
+    CREATE INDEX IF NOT EXISTS idx_submissions_user_created ON submissions (user_id, created_at);
+    -- /actions?action=&user_id=
+    CREATE INDEX IF NOT EXISTS idx_actions_action_created ON actions (action, created_at);
+    CREATE INDEX IF NOT EXISTS idx_actions_user_created ON actions (user_id, created_at);
+    -- /questions?user_id=, /reports?user_id=
+    CREATE INDEX IF NOT EXISTS idx_questions_user_created ON questions (user_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_reports_user_created ON reports (user_id, created_at);
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    await execute_script(db, SCRIPT)
@@ -0,0 +1,22 @@
+"""
+Индексы по created_at без хвостового user_id. Он нужен был подсчёту активных
+за неделю, который теперь читает users.last_seen (m0003). В индексе (created_at)
+за датой сразу идёт rowid, поэтому порядок списков ORDER BY created_at, id
+целиком берётся из индекса: записи одной секунды (пачки ActionLog) не
+досортировываются во временном B-дереве.
+"""
+import aiosqlite
+
+from . import execute_script
+
+TABLES = ("submissions", "actions", "questions", "reports")
+
+SCRIPT = """
+    DROP INDEX IF EXISTS idx_{table}_created;
+    CREATE INDEX IF NOT EXISTS idx_{table}_created ON {table} (created_at);
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    for table in TABLES:
+        await execute_script(db, SCRIPT.format(table=table))
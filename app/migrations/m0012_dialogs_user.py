@@ -0,0 +1,14 @@
+"""Список диалогов одного пользователя (/dialogs?user_id=) в порядке (updated_at, id) по индексу."""
+import aiosqlite
+
+from . import execute_script
+
+SCRIPT = """
+    -- WHERE user_id = ? ORDER BY updated_at DESC, id DESC; idx_dialogs_user_status
+    -- начинается с (user_id, status) и без фильтра по статусу порядка не даёт
+    CREATE INDEX IF NOT EXISTS idx_dialogs_user_updated ON dialogs (user_id, updated_at);
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    await execute_script(db, SCRIPT)
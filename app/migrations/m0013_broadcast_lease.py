@@ -0,0 +1,17 @@
+"""
+Аренда рассылки: процесс, который её шлёт, и срок аренды (unix-время). Реплики
+API продолжают только рассылку без владельца или с истёкшей арендой, поэтому
+одно задание не уходит получателям дважды.
+"""
+import aiosqlite
+
+from . import execute_script
+
+SCRIPT = """
+    ALTER TABLE broadcasts ADD COLUMN owner TEXT;
+    ALTER TABLE broadcasts ADD COLUMN lease_until INTEGER;
+"""
+
+
+async def upgrade(db: aiosqlite.Connection) -> None:
+    await execute_script(db, SCRIPT)
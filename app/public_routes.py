@@ -1,8 +1,12 @@
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
 from fastapi.responses import RedirectResponse
 
+from .assets import StaticAssets
+
 
-def build_public_router() -> APIRouter:
+def build_public_router(assets: StaticAssets) -> APIRouter:
     router = APIRouter()
 
     @router.get("/", include_in_schema=False)
@@ -13,4 +17,15 @@ def build_public_router() -> APIRouter:
     async def health() -> dict:
         return {"status": "ok"}
 
+    @router.get("/admin_panel/assets/{name}", include_in_schema=False)
+    async def admin_asset(
+        name: str,
+        accept_encoding: str = Header(""),
+        if_none_match: Optional[str] = Header(None),
+    ):
+        response = assets.response(name, accept_encoding, if_none_match)
+        if response is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+        return response
+
     return router
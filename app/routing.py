@@ -0,0 +1,103 @@
+from typing import Any, Callable, Dict, Optional, Union
+
+from aiogram import Router
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.dispatcher.flags import extract_flags_from_object
+from aiogram.filters import Filter
+from aiogram.types import CallbackQuery, Message
+
+CALLBACK_SEPARATOR = "::"
+
+
+class Route(CallableObject):
+    """Хендлер из таблицы маршрутов; name попадает в журнал и метрики."""
+
+    @property
+    def name(self) -> str:
+        return getattr(self.callback, "__name__", "route")
+
+    @property
+    def flags(self) -> Dict[str, Any]:
+        # флаги читаются с функции, как у обычных хендлеров (@flags.action(...))
+        return extract_flags_from_object(self.callback)
+
+
+class RouteTable:
+    """
+    Таблица маршрутов для кнопок: точный текст сообщения и callback_data
+    ищутся в словарях вместо перебора фильтров F.text == ... по очереди.
+    Для callback_data вида "prefix::payload" ключом служит prefix.
+
+    В aiogram регистрируется по одному хендлеру на тип события, найденный
+    маршрут передаётся в него аргументом route.
+    """
+
+    def __init__(self) -> None:
+        self.texts: Dict[str, Route] = {}
+        self.callbacks: Dict[str, Route] = {}
+        self.prefixes: Dict[str, Route] = {}
+
+    @staticmethod
+    def _add(index: Dict[str, Route], keys, callback: Callable[..., Any]) -> None:
+        route = Route(callback=callback)
+        for key in keys:
+            if key in index:
+                raise ValueError(f"Route {key!r} is already handled by {index[key].name}")
+            index[key] = route
+
+    def message(self, *texts: str):
+        def decorator(callback):
+            self._add(self.texts, texts, callback)
+            return callback
+        return decorator
+
+    def callback(self, *data: str):
+        def decorator(callback):
+            self._add(self.callbacks, data, callback)
+            return callback
+        return decorator
+
+    def callback_prefix(self, *prefixes: str):
+        def decorator(callback):
+            self._add(self.prefixes, prefixes, callback)
+            return callback
+        return decorator
+
+    def match_text(self, text: Optional[str]) -> Optional[Route]:
+        if text is None:
+            return None
+        return self.texts.get(text)
+
+    def match_callback(self, data: Optional[str]) -> Optional[Route]:
+        if data is None:
+            return None
+        route = self.callbacks.get(data)
+        if route is None and CALLBACK_SEPARATOR in data:
+            route = self.prefixes.get(data.split(CALLBACK_SEPARATOR, 1)[0])
+        return route
+
+    def attach(self, router: Router) -> None:
+        """
+        Регистрирует таблицу в роутере. Порядок важен: хендлеры, добавленные
+        в роутер раньше, проверяются раньше таблицы, позже — после неё.
+        """
+        table = self
+
+        class _TextRoute(Filter):
+            async def __call__(self, message: Message) -> Union[bool, Dict[str, Any]]:
+                route = table.match_text(message.text)
+                return {"route": route} if route is not None else False
+
+        class _CallbackRoute(Filter):
+            async def __call__(self, call: CallbackQuery) -> Union[bool, Dict[str, Any]]:
+                route = table.match_callback(call.data)
+                return {"route": route} if route is not None else False
+
+        async def dispatch_message(message: Message, route: Route, **kwargs: Any) -> Any:
+            return await route.call(message, **kwargs)
+
+        async def dispatch_callback(call: CallbackQuery, route: Route, **kwargs: Any) -> Any:
+            return await route.call(call, **kwargs)
+
+        router.message.register(dispatch_message, _TextRoute())
+        router.callback_query.register(dispatch_callback, _CallbackRoute())
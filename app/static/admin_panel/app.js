@@ -10,6 +10,16 @@ const state = {
   limit: parseInt(localStorage.getItem(STORAGE_LIMIT_KEY) || "50", 10),
   dialogs: [],
   currentDialog: null,
+  // подписка на /events (EventSource)
+  live: null,
+  // курсор журнала изменений для /changes
+  changesToken: null,
+  // курсоры для "Загрузить ещё": id последней полученной записи
+  cursors: {
+    questions: null,
+    reports: null,
+    dialogs: null,
+  },
 };
 
 function setBaseUrl(url) {
@@ -22,6 +32,16 @@ function setLimit(limit) {
   localStorage.setItem(STORAGE_LIMIT_KEY, String(limit));
 }
 
+// пользовательский текст (сообщения, username) вставляется в разметку только так
+function escapeHtml(value) {
+  return String(value ?? "")
+    .replace(/&/g, "&amp;")
+    .replace(/</g, "&lt;")
+    .replace(/>/g, "&gt;")
+    .replace(/"/g, "&quot;")
+    .replace(/'/g, "&#39;");
+}
+
 function apiUrl(path) {
   const base = state.baseUrl?.trim() || "";
   const normalized = base ? base.replace(/\/$/, "") : "";
@@ -159,6 +179,24 @@ function renderPanel() {
         </div>
       </div>
 
+      <div class="panel-block">
+        <div class="panel-header">
+          <h3>Поиск</h3>
+        </div>
+        <form id="search-form" class="chips">
+          <input type="text" id="search-query" placeholder="Текст сообщения или username">
+          <select id="search-kind">
+            <option value="">Везде</option>
+            <option value="question">Вопросы</option>
+            <option value="report">Отчеты</option>
+            <option value="dialog">Диалоги</option>
+          </select>
+          <button type="submit">Найти</button>
+        </form>
+        <div id="search-results"></div>
+        <div class="load-more" id="search-more"></div>
+      </div>
+
       <div class="panel-block">
         <div class="panel-header">
           <h3>Вопросы админам</h3>
@@ -166,6 +204,7 @@ function renderPanel() {
         </div>
         <div id="questions-status" class="muted"></div>
         <div class="cards-grid" id="questions-cards"></div>
+        <div class="load-more" id="questions-more"></div>
       </div>
 
       <div class="panel-block">
@@ -175,6 +214,7 @@ function renderPanel() {
         </div>
         <div id="reports-status" class="muted"></div>
         <div class="cards-grid" id="reports-cards"></div>
+        <div class="load-more" id="reports-more"></div>
       </div>
 
       <div class="panel-block">
@@ -223,7 +263,10 @@ function renderPanel() {
           </div>
         </div>
         <div class="dialogs">
-          <div class="dialogs-list" id="dialogs-list"></div>
+          <div>
+            <div class="dialogs-list" id="dialogs-list"></div>
+            <div class="load-more" id="dialogs-more"></div>
+          </div>
           <div class="dialogs-chat" id="dialogs-chat">
             <p class="muted">Выберите диалог слева</p>
           </div>
@@ -239,6 +282,7 @@ function renderPanel() {
       // ignore
     } finally {
       state.authenticated = false;
+      disconnectLive();
       renderLogin();
     }
   });
@@ -253,22 +297,162 @@ function renderPanel() {
 
   document.getElementById("refresh-all").addEventListener("click", () => {
     loadSubmissions();
-    loadActions();
-    loadQuestions();
-    loadReports();
+    syncChanges();
+  });
+  document.getElementById("load-questions").addEventListener("click", () => loadQuestions());
+  document.getElementById("load-reports").addEventListener("click", () => loadReports());
+  document.getElementById("search-form").addEventListener("submit", (e) => {
+    e.preventDefault();
+    runSearch(0);
   });
-  document.getElementById("load-questions").addEventListener("click", loadQuestions);
-  document.getElementById("load-reports").addEventListener("click", loadReports);
   document.getElementById("broadcast-form").addEventListener("submit", handleBroadcast);
   document.getElementById("card-form").addEventListener("submit", handleAddCard);
-  document.getElementById("load-dialogs").addEventListener("click", loadDialogs);
-  document.getElementById("dialogs-filter").addEventListener("change", loadDialogs);
+  document.getElementById("load-dialogs").addEventListener("click", () => loadDialogs());
+  document.getElementById("dialogs-filter").addEventListener("change", () => loadDialogs());
+
+  loadDashboard();
+  connectLive();
+}
 
-  loadSubmissions();
-  loadActions();
-  loadQuestions();
-  loadReports();
-  loadDialogs();
+// Живые обновления: сервер присылает изменения через SSE, панель применяет их
+// к уже отрисованным спискам без повторной загрузки
+function connectLive() {
+  disconnectLive();
+  if (typeof EventSource === "undefined") return;
+  const source = new EventSource(apiUrl("/events"), { withCredentials: true });
+  state.live = source;
+  let dropped = false;
+  source.addEventListener("open", () => {
+    // пока соединения не было, изменения могли пройти мимо
+    if (dropped) syncChanges();
+    dropped = false;
+  });
+  source.addEventListener("error", () => {
+    dropped = true;
+  });
+  const on = (kind, handler) =>
+    source.addEventListener(kind, (e) => handler(JSON.parse(e.data)));
+  on("reset", syncChanges);
+  on("question", (item) => {
+    if ((item.message || "").trim().length >= 5) prependCard("questions", buildQuestionCard(item));
+  });
+  on("report", (item) => prependCard("reports", buildReportCard(item)));
+  on("question_removed", (item) => removeCard("questions", item.id));
+  on("report_removed", (item) => removeCard("reports", item.id));
+  on("dialog", applyDialogUpdate);
+  on("dialog_message", (data) => {
+    applyDialogUpdate(data.dialog);
+    appendDialogMessage(data.message);
+  });
+  on("dialog_removed", (item) => removeDialog(item.id));
+}
+
+function disconnectLive() {
+  if (state.live) state.live.close();
+  state.live = null;
+}
+
+function liveConnected() {
+  return !!state.live && state.live.readyState === EventSource.OPEN;
+}
+
+const CARD_COUNT_LABELS = { questions: "Вопросов", reports: "Отчетов" };
+
+function updateCardCount(kind) {
+  const container = document.getElementById(`${kind}-cards`);
+  const status = document.getElementById(`${kind}-status`);
+  if (!container || !status) return;
+  status.textContent = `${CARD_COUNT_LABELS[kind]}: ${container.querySelectorAll(".mini-card").length}`;
+}
+
+function prependCard(kind, card) {
+  const container = document.getElementById(`${kind}-cards`);
+  if (!container) return;
+  const existing = container.querySelector(`.mini-card[data-id="${card.dataset.id}"]`);
+  if (existing) {
+    existing.replaceWith(card);
+    return;
+  }
+  container.querySelector("p.muted")?.remove();
+  container.prepend(card);
+  updateCardCount(kind);
+}
+
+function removeCard(kind, id) {
+  const container = document.getElementById(`${kind}-cards`);
+  const card = container?.querySelector(`.mini-card[data-id="${id}"]`);
+  if (!card) return;
+  card.remove();
+  updateCardCount(kind);
+}
+
+// Версия формата /dashboard, с которой умеет работать панель
+const DASHBOARD_VERSION = 1;
+
+// Первая отрисовка: все списки и счётчики одним запросом
+async function loadDashboard() {
+  const params = new URLSearchParams({ limit: String(state.limit) });
+  const filter = document.getElementById("dialogs-filter").value || "";
+  if (filter) params.set("dialogs_status", filter);
+  let data;
+  try {
+    data = await apiFetch(`/dashboard?${params}`);
+  } catch (err) {
+    data = null;
+  }
+  if (!data || data.version !== DASHBOARD_VERSION) {
+    // сервер другой версии: грузим списки по отдельности
+    loadSubmissions();
+    loadQuestions();
+    loadReports();
+    loadDialogs();
+    return;
+  }
+  state.changesToken = data.changes_token ?? null;
+  renderUserStats(data.stats);
+  renderQuestions(data.questions, false);
+  renderReports(data.reports, false);
+  renderDialogs(data.dialogs, false);
+}
+
+// Обновление: забираем только изменения после прошлой синхронизации
+// списки, которые панель обновляет из /changes (см. applyChanges)
+const LIVE_ENTITIES = "questions,reports,dialogs";
+
+async function syncChanges() {
+  if (state.changesToken === null) return loadDashboard();
+  try {
+    for (;;) {
+      const data = await apiFetch(`/changes?since=${state.changesToken}&entities=${LIVE_ENTITIES}`);
+      if (data.reset) return loadDashboard();
+      applyChanges(data);
+      state.changesToken = data.token;
+      if (!data.has_more) return;
+    }
+  } catch (err) {
+    showMessage(err.message);
+  }
+}
+
+function applyChanges(data) {
+  const changed = data.changed || {};
+  const deleted = data.deleted || {};
+  (changed.questions || []).forEach((item) => {
+    if ((item.message || "").trim().length >= 5) prependCard("questions", buildQuestionCard(item));
+  });
+  (changed.reports || []).forEach((item) => prependCard("reports", buildReportCard(item)));
+  (deleted.questions || []).forEach((id) => removeCard("questions", id));
+  (deleted.reports || []).forEach((id) => removeCard("reports", id));
+  // старые изменения первыми: последний обновлённый диалог окажется наверху
+  (changed.dialogs || [])
+    .sort((a, b) => String(a.updated_at).localeCompare(String(b.updated_at)))
+    .forEach(applyDialogUpdate);
+  (deleted.dialogs || []).forEach(removeDialog);
+}
+
+function renderUserStats(data) {
+  document.getElementById("stat-users-all").textContent = data.total ?? "0";
+  document.getElementById("stat-users-week").textContent = data.week ?? "0";
 }
 
 async function loadSubmissions() {
@@ -277,9 +461,7 @@ async function loadSubmissions() {
   statusUsersAll.textContent = "—";
   statusUsersWeek.textContent = "—";
   try {
-    const data = await apiFetch(`/stats/users`);
-    statusUsersAll.textContent = data.total ?? "0";
-    statusUsersWeek.textContent = data.week ?? "0";
+    renderUserStats(await apiFetch(`/stats/users`));
   } catch (err) {
     statusUsersAll.textContent = "Ошибка";
     statusUsersWeek.textContent = "Ошибка";
@@ -295,142 +477,219 @@ async function loadActions() {
   }
 }
 
-async function loadQuestions() {
+function pageQuery(kind, append) {
+  const params = new URLSearchParams({ limit: String(state.limit) });
+  if (append && state.cursors[kind]) params.set("before_id", state.cursors[kind]);
+  return params;
+}
+
+function renderLoadMore(kind, nextCursor, loader) {
+  state.cursors[kind] = nextCursor;
+  const holder = document.getElementById(`${kind}-more`);
+  if (!holder) return;
+  holder.innerHTML = "";
+  if (!nextCursor) return;
+  const btn = document.createElement("button");
+  btn.className = "secondary";
+  btn.textContent = "Загрузить ещё";
+  btn.addEventListener("click", () => loader(true));
+  holder.appendChild(btn);
+}
+
+function fileBlockHtml(item) {
+  return item.file_id
+    ? `<div class="mini-file"><img src="/file/${escapeHtml(item.file_id)}" class="thumb" alt="вложение"></div>`
+    : `<div class="mini-file muted">Файл отсутствует</div>`;
+}
+
+function buildQuestionCard(item) {
+  const card = document.createElement("div");
+  card.className = "mini-card";
+  card.dataset.id = item.id;
+  card.innerHTML = `
+    <div class="mini-title">#${item.id} · ${escapeHtml(item.username || item.user_id || "—")}</div>
+    <div class="mini-body">${escapeHtml(item.message || "—")}</div>
+    ${fileBlockHtml(item)}
+    <div class="mini-meta">
+      <span>${item.created_at}</span>
+    </div>
+    <div class="mini-actions">
+      <button data-id="${item.id}" class="secondary reply-question">Ответить</button>
+      <button data-id="${item.id}" class="danger reject-question">Отклонить</button>
+    </div>
+  `;
+  card.querySelector(".reply-question").addEventListener("click", async (e) => {
+    const id = e.target.dataset.id;
+    const text = prompt("Введите ответ пользователю:");
+    if (!text) return;
+    try {
+      await apiFetch(`/questions/${id}/reply`, {
+        method: "POST",
+        body: JSON.stringify({ message: text }),
+      });
+      showMessage("Ответ отправлен.");
+      e.target.closest(".mini-card")?.remove();
+      loadActions();
+    } catch (err) {
+      showMessage(err.message);
+    }
+  });
+  card.querySelector(".reject-question").addEventListener("click", async (e) => {
+    const id = e.target.dataset.id;
+    if (!confirm("Отклонить вопрос и убрать из списка?")) return;
+    try {
+      await apiFetch(`/questions/${id}/reject`, { method: "POST" });
+      e.target.closest(".mini-card").remove();
+      showMessage("Отклонено.");
+      loadActions();
+    } catch (err) {
+      showMessage(err.message);
+    }
+  });
+  return card;
+}
+
+function renderQuestions(data, append) {
   const status = document.getElementById("questions-status");
   const container = document.getElementById("questions-cards");
+  if (!append) container.innerHTML = "";
+  const items = (data.items || []).filter((i) => (i.message || "").trim().length >= 5);
+  items.forEach((item) => container.appendChild(buildQuestionCard(item)));
+  const shown = container.querySelectorAll(".mini-card").length;
+  status.textContent = `Вопросов: ${shown}`;
+  if (!shown) {
+    container.innerHTML = `<p class="muted">Нет вопросов.</p>`;
+  }
+  renderLoadMore("questions", data.next_cursor, loadQuestions);
+}
+
+async function loadQuestions(append = false) {
+  const status = document.getElementById("questions-status");
   status.textContent = "Загружаю...";
-  container.innerHTML = "";
   try {
-    const data = await apiFetch(`/questions?limit=${state.limit}`);
-    const items = (data.items || []).filter((i) => (i.message || "").trim().length >= 5);
-    status.textContent = `Вопросов: ${items.length}`;
-    if (!items.length) {
-      container.innerHTML = `<p class="muted">Нет вопросов.</p>`;
-      return;
-    }
-    items.forEach((item) => {
-      const card = document.createElement("div");
-      card.className = "mini-card";
-      const fileBlock = item.file_id
-        ? `<div class="mini-file"><img src="/file/${item.file_id}" class="thumb" alt="вложение"></div>`
-        : `<div class="mini-file muted">Файл отсутствует</div>`;
-      card.innerHTML = `
-        <div class="mini-title">#${item.id} · ${item.username || item.user_id || "—"}</div>
-        <div class="mini-body">${item.message || "—"}</div>
-        ${fileBlock}
-        <div class="mini-meta">
-          <span>${item.created_at}</span>
-        </div>
-        <div class="mini-actions">
-          <button data-id="${item.id}" class="secondary reply-question">Ответить</button>
-          <button data-id="${item.id}" class="danger reject-question">Отклонить</button>
-        </div>
-      `;
-      container.appendChild(card);
-    });
-    container.querySelectorAll(".reply-question").forEach((btn) => {
-      btn.addEventListener("click", async (e) => {
-        const id = e.target.dataset.id;
-        const text = prompt("Введите ответ пользователю:");
-        if (!text) return;
-        try {
-          await apiFetch(`/questions/${id}/reply`, {
-            method: "POST",
-            body: JSON.stringify({ message: text }),
-          });
-          showMessage("Ответ отправлен.");
-          e.target.closest(".mini-card")?.remove();
-          loadActions();
-        } catch (err) {
-          showMessage(err.message);
-        }
-      });
-    });
-    container.querySelectorAll(".reject-question").forEach((btn) => {
-      btn.addEventListener("click", async (e) => {
-        const id = e.target.dataset.id;
-        if (!confirm("Отклонить вопрос и убрать из списка?")) return;
-        try {
-          await apiFetch(`/questions/${id}/reject`, { method: "POST" });
-          e.target.closest(".mini-card").remove();
-          showMessage("Отклонено.");
-          loadActions();
-        } catch (err) {
-          showMessage(err.message);
-        }
-      });
-    });
+    renderQuestions(await apiFetch(`/questions?${pageQuery("questions", append)}`), append);
   } catch (err) {
     status.textContent = err.message;
   }
 }
 
-async function loadReports() {
+function buildReportCard(item) {
+  const card = document.createElement("div");
+  card.className = "mini-card";
+  card.dataset.id = item.id;
+  card.innerHTML = `
+    <div class="mini-title">#${item.id} · ${escapeHtml(item.username || item.user_id || "—")}</div>
+    <div class="mini-body">${escapeHtml(item.message || "—")}</div>
+    ${fileBlockHtml(item)}
+    <div class="mini-meta">
+      <span>${item.created_at}</span>
+    </div>
+    <div class="mini-actions">
+      <button data-id="${item.id}" class="secondary reply-report">Ответить</button>
+      <button data-id="${item.id}" class="danger reject-report">Отклонить</button>
+    </div>
+  `;
+  card.querySelector(".reply-report").addEventListener("click", async (e) => {
+    const id = e.target.dataset.id;
+    const text = prompt("Введите ответ по отчету:");
+    if (!text) return;
+    try {
+      await apiFetch(`/reports/${id}/reply`, {
+        method: "POST",
+        body: JSON.stringify({ message: text }),
+      });
+      showMessage("Ответ отправлен.");
+      e.target.closest(".mini-card")?.remove();
+      loadActions();
+    } catch (err) {
+      showMessage(err.message);
+    }
+  });
+  card.querySelector(".reject-report").addEventListener("click", async (e) => {
+    const id = e.target.dataset.id;
+    if (!confirm("Отклонить отчет и убрать из списка?")) return;
+    try {
+      await apiFetch(`/reports/${id}/reject`, { method: "POST" });
+      e.target.closest(".mini-card")?.remove();
+      showMessage("Отклонено.");
+      loadActions();
+    } catch (err) {
+      showMessage(err.message);
+    }
+  });
+  return card;
+}
+
+function renderReports(data, append) {
   const status = document.getElementById("reports-status");
   const container = document.getElementById("reports-cards");
+  if (!append) container.innerHTML = "";
+  (data.items || []).forEach((item) => container.appendChild(buildReportCard(item)));
+  const shown = container.querySelectorAll(".mini-card").length;
+  status.textContent = `Отчетов: ${shown}`;
+  if (!shown) {
+    container.innerHTML = `<p class="muted">Нет отчетов.</p>`;
+  }
+  renderLoadMore("reports", data.next_cursor, loadReports);
+}
+
+async function loadReports(append = false) {
+  const status = document.getElementById("reports-status");
   status.textContent = "Загружаю...";
-  container.innerHTML = "";
   try {
-    const data = await apiFetch(`/reports?limit=${state.limit}`);
-    status.textContent = `Отчетов: ${data.items.length}`;
-    if (!data.items.length) {
-      container.innerHTML = `<p class="muted">Нет отчетов.</p>`;
-      return;
-    }
-    data.items.forEach((item) => {
-      const card = document.createElement("div");
-      card.className = "mini-card";
-      const fileBlock = item.file_id
-        ? `<div class="mini-file"><img src="/file/${item.file_id}" class="thumb" alt="вложение"></div>`
-        : `<div class="mini-file muted">Файл отсутствует</div>`;
-      card.innerHTML = `
-        <div class="mini-title">#${item.id} · ${item.username || item.user_id || "—"}</div>
-        <div class="mini-body">${item.message || "—"}</div>
-        ${fileBlock}
-        <div class="mini-meta">
-          <span>${item.created_at}</span>
-        </div>
-        <div class="mini-actions">
-          <button data-id="${item.id}" class="secondary reply-report">Ответить</button>
-          <button data-id="${item.id}" class="danger reject-report">Отклонить</button>
-        </div>
+    renderReports(await apiFetch(`/reports?${pageQuery("reports", append)}`), append);
+  } catch (err) {
+    status.textContent = err.message;
+  }
+}
+
+const SEARCH_KIND_LABELS = { question: "Вопрос", report: "Отчет", dialog: "Диалог" };
+
+// сервер обрамляет совпадения символами \x02 и \x03: текст экранируется целиком,
+// и только потом они становятся <mark>
+function highlightSnippet(snippet) {
+  return escapeHtml(snippet).replace(/\x02/g, "<mark>").replace(/\x03/g, "</mark>");
+}
+
+async function runSearch(offset) {
+  const query = document.getElementById("search-query").value.trim();
+  const kind = document.getElementById("search-kind").value;
+  const results = document.getElementById("search-results");
+  const more = document.getElementById("search-more");
+  if (!query) return;
+  if (!offset) results.innerHTML = "Ищу...";
+  more.innerHTML = "";
+  try {
+    const params = new URLSearchParams({ q: query, offset: String(offset) });
+    if (kind) params.set("kind", kind);
+    const data = await apiFetch(`/search?${params}`);
+    if (!offset) results.innerHTML = "";
+    (data.items || []).forEach((item) => {
+      const row = document.createElement("div");
+      row.className = "dialog-item";
+      row.innerHTML = `
+        <div class="dialog-title"></div>
+        <div class="dialog-preview">${highlightSnippet(item.snippet || item.message || "—")}</div>
       `;
-      container.appendChild(card);
-    });
-    container.querySelectorAll(".reply-report").forEach((btn) => {
-      btn.addEventListener("click", async (e) => {
-        const id = e.target.dataset.id;
-        const text = prompt("Введите ответ по отчету:");
-        if (!text) return;
-        try {
-          await apiFetch(`/reports/${id}/reply`, {
-            method: "POST",
-            body: JSON.stringify({ message: text }),
-          });
-          showMessage("Ответ отправлен.");
-          e.target.closest(".mini-card")?.remove();
-          loadActions();
-        } catch (err) {
-          showMessage(err.message);
-        }
-      });
-    });
-    container.querySelectorAll(".reject-report").forEach((btn) => {
-      btn.addEventListener("click", async (e) => {
-        const id = e.target.dataset.id;
-        if (!confirm("Отклонить отчет и убрать из списка?")) return;
-        try {
-          await apiFetch(`/reports/${id}/reject`, { method: "POST" });
-          e.target.closest(".mini-card")?.remove();
-          showMessage("Отклонено.");
-          loadActions();
-        } catch (err) {
-          showMessage(err.message);
-        }
-      });
+      row.querySelector(".dialog-title").textContent =
+        `${SEARCH_KIND_LABELS[item.kind] || item.kind} #${item.dialog_id || item.id} · ${item.username || "—"}`;
+      if (item.kind === "dialog") {
+        row.addEventListener("click", () => openDialog(item.dialog_id));
+      }
+      results.appendChild(row);
     });
+    if (!results.children.length) {
+      results.innerHTML = `<p class="muted">Ничего не найдено</p>`;
+    }
+    if (data.next_offset !== null && data.next_offset !== undefined) {
+      const btn = document.createElement("button");
+      btn.className = "secondary";
+      btn.textContent = "Загрузить ещё";
+      btn.addEventListener("click", () => runSearch(data.next_offset));
+      more.appendChild(btn);
+    }
   } catch (err) {
-    status.textContent = err.message;
+    results.textContent = err.message;
   }
 }
 
@@ -468,48 +727,149 @@ async function handleBroadcast(event) {
     showMessage("Введите текст рассылки.");
     return;
   }
-  status.textContent = "Отправляю...";
+  status.textContent = "Запускаю...";
   try {
     const data = await apiFetch("/broadcast", {
       method: "POST",
       body: JSON.stringify({ message: text }),
     });
-    status.textContent = `Отправлено: ${data.sent}, ошибок: ${data.failed}`;
-    showMessage("Рассылка завершена.");
+    showMessage(`Рассылка #${data.id} запущена: ${data.total} получателей.`);
     textarea.value = "";
+    pollBroadcast(data.id);
   } catch (err) {
     status.textContent = err.message;
     showMessage(err.message);
   }
 }
 
+// Рассылка идёт на сервере в фоне; опрашиваем счётчики, пока не закончится
+async function pollBroadcast(id) {
+  const status = document.getElementById("broadcast-status");
+  if (!status) return;
+  try {
+    const job = await apiFetch(`/broadcast/${id}`);
+    const done = job.sent + job.failed;
+    status.textContent = `Рассылка #${job.id}: ${done} из ${job.total} · отправлено ${job.sent}, ошибок ${job.failed}`;
+    if (job.status === "done") {
+      showMessage(`Рассылка #${job.id} завершена.`);
+      return;
+    }
+  } catch (err) {
+    status.textContent = err.message;
+    return;
+  }
+  setTimeout(() => pollBroadcast(id), 2000);
+}
+
 // Диалоги
-async function loadDialogs() {
+function buildDialogItem(d) {
+  const item = document.createElement("div");
+  item.className = `dialog-item ${d.status === "closed" ? "closed" : "open"}`;
+  item.dataset.id = d.id;
+  item.innerHTML = `
+    <div class="dialog-title">#${d.id} · ${escapeHtml(d.username || d.user_id)}${d.unread_admin ? ` <span class="badge">${d.unread_admin}</span>` : ""}</div>
+    <div class="dialog-meta">${d.status === "closed" ? "Завершенный" : "Незавершенный"} • ${d.last_message_at || d.updated_at} • ${d.message_count || 0} сообщ.</div>
+    <div class="dialog-preview">${escapeHtml(d.last_message || "—")}</div>
+  `;
+  item.addEventListener("click", () => openDialog(d.id));
+  return item;
+}
+
+async function loadDialogs(append = false) {
   const listEl = document.getElementById("dialogs-list");
   if (!listEl) return;
   const filter = document.getElementById("dialogs-filter").value || "";
-  listEl.innerHTML = "Загрузка...";
+  if (!append) listEl.innerHTML = "Загрузка...";
   try {
-    const data = await apiFetch(`/dialogs${filter ? `?status=${filter}` : ""}`);
-    state.dialogs = data.items || [];
+    const params = pageQuery("dialogs", append);
+    if (filter) params.set("status", filter);
+    renderDialogs(await apiFetch(`/dialogs?${params}`), append);
+  } catch (err) {
+    listEl.textContent = err.message;
+  }
+}
+
+function renderDialogs(data, append) {
+  const listEl = document.getElementById("dialogs-list");
+  if (!listEl) return;
+  const items = data.items || [];
+  if (!append) {
+    state.dialogs = [];
     listEl.innerHTML = "";
-    state.dialogs.forEach((d) => {
-      const item = document.createElement("div");
-      item.className = `dialog-item ${d.status === "closed" ? "closed" : "open"}`;
-      item.dataset.id = d.id;
-      item.innerHTML = `
-        <div class="dialog-title">#${d.id} · ${d.username || d.user_id}</div>
-        <div class="dialog-meta">${d.status === "closed" ? "Завершенный" : "Незавершенный"} • ${d.updated_at}</div>
-        <div class="dialog-preview">${d.last_message || "—"}</div>
-      `;
-      item.addEventListener("click", () => openDialog(d.id));
-      listEl.appendChild(item);
-    });
-    if (!state.dialogs.length) {
-      listEl.innerHTML = `<p class="muted">Нет диалогов</p>`;
-    }
+  }
+  state.dialogs = state.dialogs.concat(items);
+  items.forEach((d) => listEl.appendChild(buildDialogItem(d)));
+  if (!state.dialogs.length) {
+    listEl.innerHTML = `<p class="muted">Нет диалогов</p>`;
+  }
+  renderLoadMore("dialogs", data.next_cursor, loadDialogs);
+}
+
+// Обновлённый диалог поднимается наверх списка (список отсортирован по updated_at)
+function applyDialogUpdate(d) {
+  const listEl = document.getElementById("dialogs-list");
+  if (!listEl) return;
+  state.dialogs = state.dialogs.filter((x) => x.id !== d.id);
+  listEl.querySelector(`.dialog-item[data-id="${d.id}"]`)?.remove();
+  const filter = document.getElementById("dialogs-filter").value || "";
+  if (filter && d.status !== filter) return;
+  state.dialogs.unshift(d);
+  listEl.querySelector("p.muted")?.remove();
+  listEl.prepend(buildDialogItem(d));
+}
+
+function removeDialog(id) {
+  state.dialogs = state.dialogs.filter((x) => x.id !== id);
+  document.querySelector(`#dialogs-list .dialog-item[data-id="${id}"]`)?.remove();
+  if (state.currentDialog?.id === id) {
+    state.currentDialog = null;
+    const chat = document.getElementById("dialogs-chat");
+    if (chat) chat.innerHTML = `<p class="muted">Выберите диалог слева</p>`;
+  }
+}
+
+function appendDialogMessage(m) {
+  if (state.currentDialog?.id !== m.dialog_id) return;
+  const list = document.getElementById("dialog-messages");
+  if (!list) return;
+  list.querySelector("p.muted")?.remove();
+  list.insertAdjacentHTML("beforeend", messageBubbleHtml(m));
+  list.scrollTop = list.scrollHeight;
+}
+
+function messageBubbleHtml(m) {
+  return `
+    <div class="bubble ${m.direction}">
+      <div class="bubble-meta">${m.created_at}</div>
+      <div class="bubble-text">${escapeHtml(m.message || "")}</div>
+      ${m.file_id ? `<div class="mini-file"><img src="/file/${escapeHtml(m.file_id)}" class="thumb" alt=""></div>` : ""}
+    </div>
+  `;
+}
+
+function renderHistoryMore(cursor) {
+  const holder = document.getElementById("dialog-history-more");
+  if (!holder) return;
+  holder.innerHTML = "";
+  if (!cursor) return;
+  const btn = document.createElement("button");
+  btn.className = "secondary";
+  btn.textContent = "Показать более ранние";
+  btn.addEventListener("click", () => loadEarlierMessages(cursor));
+  holder.appendChild(btn);
+}
+
+async function loadEarlierMessages(cursor) {
+  if (!state.currentDialog) return;
+  const list = document.getElementById("dialog-messages");
+  try {
+    const params = new URLSearchParams({ before_message_id: String(cursor), limit: String(state.limit) });
+    const data = await apiFetch(`/dialogs/${state.currentDialog.id}/messages?${params}`);
+    const html = (data.items || []).map(messageBubbleHtml).join("");
+    list.insertAdjacentHTML("afterbegin", html);
+    renderHistoryMore(data.next_cursor);
   } catch (err) {
-    listEl.innerHTML = err.message;
+    showMessage(err.message);
   }
 }
 
@@ -518,20 +878,11 @@ async function openDialog(id) {
   if (!chat) return;
   chat.innerHTML = "Загрузка...";
   try {
-    const dialog = await apiFetch(`/dialogs/${id}`);
+    // сначала грузим только хвост переписки, ранние сообщения — по кнопке
+    const dialog = await apiFetch(`/dialogs/${id}?limit=${state.limit}`);
     state.currentDialog = dialog;
     const msgs = dialog.messages || [];
-    const msgsHtml = msgs
-      .map(
-        (m) => `
-        <div class="bubble ${m.direction}">
-          <div class="bubble-meta">${m.created_at}</div>
-          <div class="bubble-text">${m.message || ""}</div>
-          ${m.file_id ? `<div class="mini-file"><img src="/file/${m.file_id}" class="thumb" alt=""></div>` : ""}
-        </div>
-      `
-      )
-      .join("");
+    const msgsHtml = msgs.map(messageBubbleHtml).join("");
     const controls = `
       <div class="dialog-actions">
         <textarea id="dialog-message" rows="2" placeholder="Сообщение пользователю"></textarea>
@@ -543,16 +894,20 @@ async function openDialog(id) {
       <div class="dialog-header">
         <div>
           <div class="dialog-title">Диалог #${dialog.id}</div>
-          <div class="dialog-meta">${dialog.username || dialog.user_id} • ${dialog.status}</div>
+          <div class="dialog-meta">${escapeHtml(dialog.username || dialog.user_id)} • ${dialog.status}</div>
         </div>
       </div>
-      <div class="dialog-messages">${msgsHtml || '<p class="muted">Нет сообщений</p>'}</div>
+      <div class="load-more" id="dialog-history-more"></div>
+      <div class="dialog-messages" id="dialog-messages">${msgsHtml || '<p class="muted">Нет сообщений</p>'}</div>
       ${controls}
     `;
+    renderHistoryMore(dialog.next_cursor);
+    const list = document.getElementById("dialog-messages");
+    list.scrollTop = list.scrollHeight;
     document.getElementById("dialog-send").addEventListener("click", sendDialogMessage);
     document.getElementById("dialog-close").addEventListener("click", promptCloseDialog);
   } catch (err) {
-    chat.innerHTML = err.message;
+    chat.textContent = err.message;
   }
 }
 
@@ -567,6 +922,8 @@ async function sendDialogMessage() {
       body: JSON.stringify({ text }),
     });
     input.value = "";
+    // при живом соединении сообщение и карточка диалога придут событием
+    if (liveConnected()) return;
     await openDialog(state.currentDialog.id);
     await loadDialogs();
   } catch (err) {
@@ -0,0 +1,53 @@
+import asyncio
+import hmac
+import logging
+from typing import Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from fastapi import APIRouter, Header, HTTPException, Request, Response, status
+
+from .config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+def build_webhook_router(settings: Settings, dispatcher: Dispatcher, bot: Bot) -> APIRouter:
+    """
+    Приём обновлений Telegram по вебхуку.
+    Ответ уходит сразу, обработка идёт фоновой задачей: Telegram не ждёт хендлеров
+    и не шлёт повторы из-за медленного ответа.
+    """
+    router = APIRouter()
+    tasks: Set[asyncio.Task] = set()
+    secret = settings.webhook_secret or ""
+
+    async def _process(update: Update) -> None:
+        try:
+            await dispatcher.feed_update(bot, update)
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to process update %s", update.update_id)
+
+    @router.post(settings.webhook_path, include_in_schema=False)
+    async def telegram_webhook(
+        request: Request,
+        x_telegram_bot_api_secret_token: Optional[str] = Header(None),
+    ) -> Response:
+        if not hmac.compare_digest(x_telegram_bot_api_secret_token or "", secret):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid secret token")
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid update")
+        task = asyncio.create_task(_process(update))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return Response(status_code=status.HTTP_200_OK)
+
+    async def _drain() -> None:
+        # дожидаемся начатых хендлеров, пока соединения с БД ещё открыты
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    router.add_event_handler("shutdown", _drain)
+    return router
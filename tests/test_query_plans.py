@@ -0,0 +1,138 @@
+"""
+Планы горячих запросов db.py. SQL снимается с настоящих методов Database,
+поэтому тест ловит переписанный запрос, который обходит таблицу целиком
+(голый SCAN <таблица>) или досортировывает строки во временном B-дереве.
+"""
+import asyncio
+import re
+import sqlite3
+from contextlib import closing
+from typing import Any, Awaitable, Callable, List, Tuple
+
+import aiosqlite
+import pytest
+
+from app.db import Database
+
+FULL_SCAN = re.compile(r"^SCAN \w+$")
+
+Call = Callable[[Database, dict], Awaitable[Any]]
+
+
+async def _seed(database: Database) -> dict:
+    ids = {}
+    for user_id, bank in ((1, "tbank"), (2, "alpha"), (1, "mts")):
+        ids["submission"] = await database.add_submission(user_id, "u", bank, "comment", None)
+    await database.add_actions(
+        [(user_id, "u", action, "{}", "2025-01-01 10:00:00") for user_id in (1, 2) for action in ("start", "age_selected")]
+    )
+    ids["action"] = await database.add_action("start", 1, "u")
+    ids["question"] = await database.add_question(1, "u", "когда придёт карта")
+    await database.add_question(2, "u", "второй вопрос")
+    ids["report"] = await database.add_report(1, "u", "карта получена")
+    await database.add_report(2, "u", "второй отчёт")
+    ids["dialog"] = await database.get_or_create_dialog(1, "u")
+    await database.get_or_create_dialog(2, "u")
+    for text in ("привет", "ещё сообщение"):
+        ids["message"] = await database.add_dialog_message(ids["dialog"], "user", text)
+    ids["broadcast"] = (await database.create_broadcast("рассылка"))["id"]
+    ids["changes"] = await database.changes_token()
+    return ids
+
+
+CASES: List[Tuple[str, Call]] = [
+    ("list_submissions", lambda db, ids: db.list_submissions()),
+    ("list_submissions_cursor", lambda db, ids: db.list_submissions(before_id=ids["submission"])),
+    ("list_submissions_newer", lambda db, ids: db.list_submissions(after_id=ids["submission"] - 1)),
+    ("list_submissions_bank", lambda db, ids: db.list_submissions(bank="tbank", before_id=ids["submission"])),
+    (
+        "list_submissions_status_dates",
+        lambda db, ids: db.list_submissions(status="pending", date_from="2020-01-01 00:00:00", date_to="2100-01-01 00:00:00"),
+    ),
+    ("list_submissions_user", lambda db, ids: db.list_submissions(user_id=1, before_id=ids["submission"])),
+    ("list_submissions_sort_bank", lambda db, ids: db.list_submissions(sort="bank", before_id=ids["submission"])),
+    ("list_submissions_sort_status", lambda db, ids: db.list_submissions(sort="-status", status="pending")),
+    ("list_submissions_for_user", lambda db, ids: db.list_submissions_for_user(1, cursor=ids["submission"])),
+    ("get_submission", lambda db, ids: db.get_submission(ids["submission"])),
+    ("list_actions", lambda db, ids: db.list_actions()),
+    ("list_actions_cursor", lambda db, ids: db.list_actions(before_id=ids["action"])),
+    ("list_actions_action", lambda db, ids: db.list_actions(action="start", before_id=ids["action"])),
+    (
+        "list_actions_user_dates",
+        lambda db, ids: db.list_actions(user_id=1, date_from="2020-01-01 00:00:00", date_to="2100-01-01 00:00:00"),
+    ),
+    ("list_actions_dates_cursor", lambda db, ids: db.list_actions(date_from="2020-01-01 00:00:00", before_id=ids["action"])),
+    ("list_questions", lambda db, ids: db.list_questions()),
+    ("list_questions_cursor", lambda db, ids: db.list_questions(before_id=ids["question"], user_id=1)),
+    ("get_question", lambda db, ids: db.get_question(ids["question"])),
+    ("list_reports", lambda db, ids: db.list_reports()),
+    ("list_reports_cursor", lambda db, ids: db.list_reports(before_id=ids["report"], user_id=1)),
+    ("get_report", lambda db, ids: db.get_report(ids["report"])),
+    ("list_dialogs", lambda db, ids: db.list_dialogs()),
+    ("list_dialogs_status_cursor", lambda db, ids: db.list_dialogs(status="open", before_id=ids["dialog"])),
+    ("list_dialogs_newer", lambda db, ids: db.list_dialogs(after_id=ids["dialog"])),
+    ("list_dialogs_user", lambda db, ids: db.list_dialogs(user_id=1)),
+    ("get_or_create_dialog", lambda db, ids: db.get_or_create_dialog(1, "u")),
+    ("get_dialog", lambda db, ids: db.get_dialog(ids["dialog"])),
+    ("get_dialog_header", lambda db, ids: db.get_dialog_header(ids["dialog"])),
+    (
+        "list_dialog_messages_cursor",
+        lambda db, ids: db.list_dialog_messages(ids["dialog"], before_message_id=ids["message"]),
+    ),
+    ("get_dialog_message", lambda db, ids: db.get_dialog_message(ids["message"])),
+    ("count_users_all", lambda db, ids: db.count_users_all()),
+    ("count_users_last_week", lambda db, ids: db.count_users_last_week()),
+    ("changes_token", lambda db, ids: db.changes_token()),
+    ("changes_version", lambda db, ids: db.changes_version("actions")),
+    ("get_changes", lambda db, ids: db.get_changes(ids["changes"] - 5)),
+    (
+        "get_changes_entities",
+        lambda db, ids: db.get_changes(ids["changes"] - 5, entities=("questions", "reports", "dialogs")),
+    ),
+    ("get_broadcast", lambda db, ids: db.get_broadcast(ids["broadcast"])),
+    ("next_broadcast_recipients", lambda db, ids: db.next_broadcast_recipients(ids["broadcast"], -1, 100)),
+    ("get_fsm_record", lambda db, ids: db.get_fsm_record("bot:1:1")),
+]
+
+
+def _plans(path: str, call: Call) -> List[Tuple[str, List[str]]]:
+    """Выполняет call на засеянной базе и возвращает планы всех его SELECT."""
+    statements: List[Tuple[str, Any]] = []
+
+    async def run() -> None:
+        database = Database(path)
+        try:
+            await database.init_db()
+            ids = await _seed(database)
+            execute = aiosqlite.Connection.execute
+
+            def recording(self, sql, parameters=None):
+                statements.append((sql, parameters))
+                return execute(self, sql, parameters)
+
+            aiosqlite.Connection.execute = recording
+            try:
+                await call(database, ids)
+            finally:
+                aiosqlite.Connection.execute = execute
+        finally:
+            await database.close()
+
+    asyncio.run(run())
+    plans = []
+    with closing(sqlite3.connect(path)) as db:
+        for sql, parameters in statements:
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            rows = db.execute("EXPLAIN QUERY PLAN " + sql, parameters or ()).fetchall()
+            plans.append((sql, [row[3] for row in rows]))
+    return plans
+
+
+@pytest.mark.parametrize("name, call", CASES, ids=[name for name, _ in CASES])
+def test_hot_query_uses_index(tmp_path, name: str, call: Call) -> None:
+    plans = _plans(str(tmp_path / "plans.db"), call)
+    assert plans, f"{name}: no SELECT executed"
+    for sql, plan in plans:
+        bad = [step for step in plan if FULL_SCAN.match(step) or "USE TEMP B-TREE" in step]
+        assert not bad, f"{name}: {bad}\n{sql}"